@@ -1,5 +1,5 @@
 import streamlit as st
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 import json
 import pandas as pd # Import pandas for DataFrame creation
 
@@ -9,6 +9,10 @@ import ontology_processor
 import document_processor
 import ui_generator
 
+# assess_gaps: confidence of deterministic matches, and ambiguous terms sent per LLM call
+MATCH_CONFIDENCE = {"exact": 1.0, "normalized": 0.9, "acronym": 0.7}
+GAP_ASSESSMENT_BATCH_SIZE = 25
+
 class OntologyAgent:
     def __init__(self, ontology_proc: ontology_processor.OntologyProcessor):
         self.ontology_proc = ontology_proc
@@ -33,7 +37,7 @@ class OntologyAgent:
     def _clear_pending_ui(self):
         st.session_state.pending_ui_specs = []
         # Clear selections associated with previous UI
-        keys_to_remove = [k for k in st.session_state if k.startswith('selected_value_')]
+        keys_to_remove = [k for k in st.session_state if k.startswith('selected_value_') or k.startswith('page_')]
         for k in keys_to_remove:
             del st.session_state[k]
         # Reset task-specific state that UI relied on
@@ -90,6 +94,32 @@ class OntologyAgent:
         # 3. Execute Action
         self._execute_action(action, params)
 
+    def _run_cancellable_query(self, run_query: Callable[[], Any]) -> Any:
+        """
+        Runs run_query() with a Cancel button shown while the query runs. Clicking it (or
+        sending a new message) makes Streamlit stop this script run at the next page
+        update, which the processor's wait callback makes every second. The interrupted
+        wait terminates the query's worker, or stops consuming rows when the query runs
+        in-process (query workers are opt-in: enable_query_workers).
+        """
+        status = st.empty()
+        with status.container():
+            st.button("Cancel query", key="cancel_query")
+            elapsed_line = st.empty()
+        shown = [-1]
+
+        def _on_wait(elapsed: float):
+            if int(elapsed) != shown[0]:
+                shown[0] = int(elapsed)
+                elapsed_line.caption(f"Running query... {shown[0]}s")
+
+        self.ontology_proc.on_query_wait = _on_wait
+        try:
+            return run_query()
+        finally:
+            self.ontology_proc.on_query_wait = None
+            status.empty()
+
     def handle_ui_callback(self, element_id: str, event_data: Dict):
         action = event_data.get("action")
         spec = event_data.get("spec", {})
@@ -237,20 +267,57 @@ class OntologyAgent:
             if sparql_query:
                 self._add_message("assistant", "LLM Placeholder generated SPARQL query:")
                 self._add_ui_spec({"type":"markdown", "content": f"```sparql\n{sparql_query}\n```"})
+                # Static checks before evaluation: unknown terms and cross products are rejected, LIMIT is added
+                check = self.ontology_proc.validate_sparql_query(sparql_query)
+                if not check["valid"]:
+                     problems = "\n".join(f"- {e}" for e in check["errors"])
+                     self._add_message("assistant", f"The generated query was not executed:\n{problems}")
+                     self._add_ui_spec({"type":"error", "text":f"Query rejected: {check['errors'][0]}"})
+                     return
+                sparql_query = check["query"]
+                if check["warnings"]:
+                     self._add_ui_spec({"type": "info", "text": "\n".join(check["warnings"])})
                 self._add_message("assistant", "Attempting to execute the generated query...")
-                results = self.ontology_proc.run_sparql_query(sparql_query)
+                # Only the first page is materialized; the table fetches further pages on demand
+                page_size = 100
+                results = self._run_cancellable_query(lambda: self.ontology_proc.get_sparql_page(sparql_query, 0, page_size))
                 st.session_state.last_query_results = results
                 if results is not None:
                      self._add_message("assistant", "Query Execution Result:")
                      if results:
-                         self._add_ui_spec({"type": "dataframe", "data": pd.DataFrame(results), "id": "query_results_table"})
+                         ontology_proc = self.ontology_proc
+                         self._add_ui_spec({
+                             "type": "paged_dataframe",
+                             "fetch_page": lambda page: pd.DataFrame(ontology_proc.get_sparql_page(sparql_query, page, page_size) or []),
+                             "page_size": page_size,
+                             "id": "query_results_table"
+                         })
                      else:
                          self._add_ui_spec({"type": "info", "text": "Query executed, no results returned."})
                 else:
-                     self._add_message("assistant", "Query execution failed (check query syntax or ontology).", ui_spec={"type":"error", "text":"Query execution failed"})
+                     error = self.ontology_proc.last_query_error or "check query syntax or ontology"
+                     self._add_message("assistant", f"Query execution failed ({error}).")
+                     self._add_ui_spec({"type":"error", "text":f"Query execution failed: {error}"})
             else:
                  self._add_message("assistant", "LLM Placeholder failed to generate a SPARQL query.", ui_spec={"type":"warning", "text":"SPARQL generation failed"})
 
+        elif action == "search_ontology":
+            if not st.session_state.ontology_loaded:
+                self._add_message("assistant", "Action requires loaded ontology.", ui_spec={"type": "warning", "text":"Ontology not loaded."}); return
+
+            keywords = params.get("keywords") or params.get("query_description")
+            if not keywords:
+                self._add_message("assistant", "Missing 'keywords' parameter.", ui_spec={"type":"error", "text":"Missing parameter"}); return
+
+            # Answered from the full-text index directly, no SPARQL generation needed
+            matches = self.ontology_proc.search_text(keywords, limit=20)
+            if matches:
+                self._add_message("assistant", f"Concepts mentioning '{keywords}':")
+                self._add_ui_spec({"type": "dataframe", "data": pd.DataFrame(matches), "id": "text_search_results_table"})
+            else:
+                self._add_message("assistant", f"No concepts mention '{keywords}'.")
+                self._add_ui_spec({"type": "info", "text": f"No matches for '{keywords}'."})
+
         elif action == "explain_ontology_concept":
             if not st.session_state.ontology_loaded:
                  self._add_message("assistant", "Action requires loaded ontology.", ui_spec={"type": "warning", "text":"Ontology not loaded."}); return
@@ -310,31 +377,57 @@ class OntologyAgent:
             if not all_extracted_terms or all_extracted_terms[0].get("type") == "PLACEHOLDER": # Check if extraction yielded placeholder
                  self._add_message("assistant", "Term extraction (placeholder) did not yield usable results for gap assessment.", ui_spec={"type":"info", "text":"Term extraction failed/placeholder."}); return
 
-            # 2. Call LLM Placeholder for Gap Assessment
-            self._add_message("assistant", "Step 2: Calling LLM Placeholder for gap assessment...", is_explanation=True)
-            classes = self.ontology_proc.get_classes()
-            individuals = self.ontology_proc.get_individuals()
-            labels = self.ontology_proc.get_all_labels()
-
-            # --- LLM Placeholder Call ---
-            gaps_result = llm_interface.assess_knowledge_gaps_llm(
-                extracted_terms=all_extracted_terms, # Pass the results from step 1
-                ontology_classes=classes,
-                ontology_individuals=individuals,
-                ontology_labels=labels
-            )
-            st.session_state.last_gaps_assessment = gaps_result
-
-            # 3. Display Placeholder Results
-            self._add_message("assistant", "LLM Placeholder response for knowledge gaps:")
-            summary = gaps_result.get('summary', "[Placeholder summary missing]")
-            gaps_found = gaps_result.get('gaps_found', [])
+            # 2. Match every term locally; only those with no deterministic match but a close label go to the LLM
+            self._add_message("assistant", "Step 2: Matching terms against all ontology labels...", is_explanation=True)
+            term_info = {}
+            for term in all_extracted_terms:
+                if isinstance(term, dict) and term.get("text"):
+                    term_info.setdefault(str(term["text"]), term) # First occurrence gives the context
+            rows, ambiguous = [], []
+            for match in self.ontology_proc.match_terms(term_info):
+                info = term_info[match["term"]]
+                row = {"term": match["term"], "term_type": info.get("type"), "context": info.get("doc_context"), "document": info.get("document")}
+                if match["status"] in MATCH_CONFIDENCE:
+                    labels = ", ".join(self.ontology_proc.get_label(uri) or uri for uri in match["uris"][:3])
+                    row.update(status=f"Matched ({match['status']})", suggestion=f"Matches {labels}", confidence=MATCH_CONFIDENCE[match["status"]])
+                elif match["status"] == "ambiguous":
+                    best = match["candidates"][0]
+                    row.update(status="Potential Variant/Related", suggestion=f"Closest concept: {best['label']} <{best['uri']}>", confidence=best["score"])
+                    ambiguous.append((row, match["candidates"]))
+                else:
+                    row.update(status="Not Found", suggestion="No similar label; consider adding a new concept", confidence=0.9)
+                rows.append(row)
+
+            # 3. LLM Placeholder decides the ambiguous terms, in batches
+            llm_calls = 0
+            for start in range(0, len(ambiguous), GAP_ASSESSMENT_BATCH_SIZE):
+                batch = ambiguous[start:start + GAP_ASSESSMENT_BATCH_SIZE]
+                self._add_message("assistant", f"Step 3: Calling LLM Placeholder for {len(batch)} ambiguous term(s)...", is_explanation=True)
+                # --- LLM Placeholder Call ---
+                gaps_result = llm_interface.assess_knowledge_gaps_llm([
+                    {"term": row["term"], "term_type": row["term_type"], "context": row["context"],
+                     "candidates": [{"uri": c["uri"], "label": c["label"], "score": c["score"]} for c in candidates]}
+                    for row, candidates in batch])
+                llm_calls += 1
+                verdicts = {g.get("term"): g for g in gaps_result.get("gaps_found", []) if isinstance(g, dict)}
+                for row, _ in batch:
+                    verdict = verdicts.get(row["term"])
+                    if verdict and verdict.get("status") in ("Not Found", "Potential Variant/Related"):
+                        row.update({key: verdict[key] for key in ("status", "suggestion", "confidence") if key in verdict})
+
+            gaps_found = [row for row in rows if not row["status"].startswith("Matched")]
+            counts = {status: sum(row["status"] == status for row in rows) for status in dict.fromkeys(row["status"] for row in rows)}
+            summary = (f"{len(rows)} distinct terms assessed: " + ", ".join(f"{n} {status}" for status, n in counts.items())
+                       + f". {len(ambiguous)} ambiguous term(s) reviewed in {llm_calls} LLM call(s).")
+            st.session_state.last_gaps_assessment = {"gaps_found": gaps_found, "summary": summary, "terms": rows}
+
+            # 4. Display Results
+            self._add_message("assistant", "Knowledge gap assessment:")
             self._add_ui_spec({"type": "markdown", "content": f"**Summary:** {summary}"})
             if gaps_found:
-                 # Use DataFrame even for placeholder data
                  self._add_ui_spec({"type": "dataframe", "data": pd.DataFrame(gaps_found), "id": "gaps_table"})
             else:
-                 self._add_ui_spec({"type": "info", "text": "Placeholder indicated no gaps found or failed."})
+                 self._add_ui_spec({"type": "info", "text": "Every term matches an ontology label."})
 
 
         elif action == "align_entity":
@@ -346,12 +439,15 @@ class OntologyAgent:
                  self._add_message("assistant", "Missing 'entity_to_align' parameter.", ui_spec={"type":"error", "text":"Missing parameter"}); return
 
             self._add_message("assistant", f"Calling LLM placeholder to find alignments for '{entity_text}'...", is_explanation=True)
-            classes = self.ontology_proc.get_classes()
-            individuals = self.ontology_proc.get_individuals()
-            labels = self.ontology_proc.get_all_labels()
+            # Candidates come from local trigram and embedding indexes over every concept; the LLM only re-ranks them
+            # Over-fetch so that filtering out properties still leaves up to 10 candidates
+            candidates = [c for c in self.ontology_proc.get_alignment_candidates(entity_text, limit=20) if c["type"] != "Property"][:10]
 
             # --- LLM Placeholder Call ---
-            alignment_suggestions = llm_interface.suggest_alignment_llm(entity_text, classes, individuals, labels)
+            alignment_suggestions = llm_interface.suggest_alignment_llm(entity_text, candidates)
+            if not alignment_suggestions.get("suggestions"): # No usable re-ranking; fall back to the lexical order
+                alignment_suggestions = {"entity_text": entity_text, "suggestions": [
+                    {"uri": c["uri"], "label": f"{c['label']} ({c['type']})", "type": c["type"], "score": c["score"]} for c in candidates[:5]]}
             st.session_state.last_alignment_suggestions = alignment_suggestions # Store for callback context
 
             # --- Display Placeholder Suggestions UI ---
@@ -0,0 +1,169 @@
+import json
+import os
+try:
+    import fcntl
+except ImportError: # Windows: journals are not locked
+    fcntl = None
+from typing import Any, Callable, Dict, List, Optional
+
+# Write-ahead journal of ontology edits. Each ontology gets a directory holding a graph
+# snapshot and an append-only JSON-lines journal of the edits made on top of it:
+#   {"op": "base", "snapshot": <generation or null>}   first line: the snapshot it builds on
+#   {"op": "edit", "add": [...], "remove": [...]}      an applied edit (encoded triples)
+#   {"op": "undo"} / {"op": "redo"}                    cursor moves
+# Replaying the records rebuilds the edit list and the cursor (number of edits applied),
+# so undo/redo are cursor moves and a restart only replays the journal on top of the
+# snapshot. A new edit after an undo discards the undone edits. Compaction writes the
+# current graph as the next snapshot generation and starts an empty journal on it.
+# A journal belongs to one session at a time: open() takes an exclusive lock on the
+# directory, held until close(), so no other session (or process) appends to or
+# compacts a journal whose edits it does not have.
+
+JOURNAL_FILE = "journal.jsonl"
+LOCK_FILE = "journal.lock"
+
+
+class JournalLockedError(RuntimeError):
+    """The journal is open in another session."""
+
+
+class ChangeJournal:
+    """Edit journal of one session's edits to one ontology. Call open() before use."""
+
+    def __init__(self, directory: str, compact_every: int = 1000):
+        self.directory = directory
+        self.compact_every = compact_every # Edits kept in the journal before it is compacted
+        self.generation: Optional[int] = None # Snapshot generation the journal builds on
+        self.entries: List[Dict[str, Any]] = [] # Edits since the snapshot (including undone ones)
+        self.head = 0 # Number of entries currently applied
+        self._file = None
+        self._lock_file = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_FILE)
+
+    @property
+    def snapshot_path(self) -> Optional[str]:
+        if self.generation is None:
+            return None
+        return os.path.join(self.directory, f"snapshot-{self.generation}.snap")
+
+    def open(self):
+        """
+        Locks the journal, reads it (if any) and opens it for appending. A torn last record
+        is dropped. Raises JournalLockedError if another session has it open.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock()
+        good_bytes = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # Partial write from a crash; everything after it is unusable
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply_record(record)
+                    good_bytes += len(line)
+        if good_bytes == 0:
+            self._rewrite(self.generation)
+        else:
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None:
+            self._lock_file.close() # Releases the lock
+            self._lock_file = None
+
+    def _lock(self):
+        self._lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise JournalLockedError(f"Edit journal {self.directory} is open in another session")
+
+    def _apply_record(self, record: Dict[str, Any]):
+        op = record.get("op")
+        if op == "base":
+            self.generation = record.get("snapshot")
+            self.entries, self.head = [], 0
+        elif op == "edit":
+            del self.entries[self.head:]
+            self.entries.append(record)
+            self.head += 1
+        elif op == "undo" and self.head > 0:
+            self.head -= 1
+        elif op == "redo" and self.head < len(self.entries):
+            self.head += 1
+
+    def _append(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno()) # Durable before the edit is acknowledged
+        self._apply_record(record)
+
+    def _rewrite(self, generation: Optional[int]):
+        """Atomically replaces the journal with an empty one based on a snapshot generation."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "base", "snapshot": generation}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._apply_record({"op": "base", "snapshot": generation})
+
+    def applied(self) -> List[Dict[str, Any]]:
+        """Edits to replay on top of the snapshot, oldest first."""
+        return self.entries[:self.head]
+
+    def record_edit(self, add: List[Any], remove: List[Any]):
+        self._append({"op": "edit", "add": add, "remove": remove})
+
+    def undo(self) -> Optional[Dict[str, Any]]:
+        """Moves the cursor back one edit and returns that edit (to be reverted), or None."""
+        if self.head == 0:
+            return None
+        entry = self.entries[self.head - 1]
+        self._append({"op": "undo"})
+        return entry
+
+    def redo(self) -> Optional[Dict[str, Any]]:
+        """Moves the cursor forward one edit and returns that edit (to be re-applied), or None."""
+        if self.head >= len(self.entries):
+            return None
+        entry = self.entries[self.head]
+        self._append({"op": "redo"})
+        return entry
+
+    def needs_compaction(self) -> bool:
+        return len(self.entries) >= self.compact_every
+
+    def compact(self, write_snapshot: Callable[[str], bool]) -> bool:
+        """
+        Writes the current graph as the next snapshot generation and starts an empty
+        journal on it; undo history before this point is dropped. The journal rewrite is
+        the commit point, so a crash leaves either the old or the new state intact.
+        """
+        old_snapshot = self.snapshot_path
+        generation = (self.generation or 0) + 1
+        new_snapshot = os.path.join(self.directory, f"snapshot-{generation}.snap")
+        if not write_snapshot(new_snapshot):
+            return False
+        self._file.close()
+        self._rewrite(generation)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if old_snapshot and os.path.exists(old_snapshot):
+            os.remove(old_snapshot)
+        return True
@@ -0,0 +1,267 @@
+import itertools
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+# Indexes over the rdf:type and rdfs:subClassOf triples of an ontology: which entities
+# are classes, properties and individuals, and the transitive class hierarchy. Both are
+# built in one pass and updated per added triple. URI strings are interned (sys.intern)
+# so every index holding the same URI shares one string object.
+
+# Anything typed with one of these is not considered an individual
+NON_INDIVIDUAL_TYPES = {OWL.Class, RDFS.Class, OWL.ObjectProperty, OWL.DatatypeProperty, OWL.AnnotationProperty, OWL.Ontology, RDF.Property}
+
+
+class ClassificationIndex:
+    """
+    Classes, individuals and properties of an ontology, built in one pass over the
+    rdf:type triples and updated per added triple. Members are kept as ordered
+    dicts of URI strings so accessors can return them without touching the graph.
+    """
+    PREDICATES = (RDF.type,) # Removing a triple with one of these means a rebuild
+
+    def __init__(self):
+        self.classes: Dict[str, None] = {}
+        self.individuals: Dict[str, None] = {}
+        self.object_properties: Dict[str, None] = {}
+        self.datatype_properties: Dict[str, None] = {}
+        self.properties: Dict[str, None] = {}
+
+    @classmethod
+    def build(cls, graph: Graph) -> "ClassificationIndex":
+        index = cls()
+        for s, _, o in graph.triples((None, RDF.type, None)):
+            index.add(s, RDF.type, o)
+        return index
+
+    def add(self, s, p, o):
+        """Classifies the subject of a single triple. Non rdf:type triples are ignored."""
+        if p != RDF.type:
+            return
+        key = sys.intern(str(s))
+        if o == OWL.Class:
+            self.classes[key] = None
+        elif o == OWL.ObjectProperty:
+            self.object_properties[key] = None
+            self.properties[key] = None
+        elif o == OWL.DatatypeProperty:
+            self.datatype_properties[key] = None
+            self.properties[key] = None
+        if o not in NON_INDIVIDUAL_TYPES and isinstance(s, URIRef):
+            self.individuals[key] = None
+
+    def copy(self) -> "ClassificationIndex":
+        clone = ClassificationIndex()
+        for name, members in vars(self).items():
+            setattr(clone, name, dict(members))
+        return clone
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "classes": len(self.classes),
+            "individuals": len(self.individuals),
+            "properties": len(self.properties),
+        }
+
+
+class ClassHierarchy:
+    """
+    rdfs:subClassOf hierarchy plus rdf:type memberships. Only the direct edges are stored,
+    so memory and updates stay linear in the number of edges; listing ancestors or
+    descendants walks the edges (cost proportional to the answer). Subsumption tests use
+    pre/post-order interval labels on a spanning forest, computed on first use after a
+    change: a class whose every path upwards lies in the forest is answered from its
+    interval alone, other classes fall back to walking their ancestors. Instances are
+    kept per directly asserted type, and each instance keeps its direct type ids. Copies
+    share the per-class edge lists and member dicts until either side changes them.
+    """
+    PREDICATES = (RDFS.subClassOf, RDF.type)
+
+    def __init__(self):
+        self._classes: List[str] = []
+        self._class_ids: Dict[str, int] = {}
+        self._parents: List[List[int]] = [] # class id -> direct superclass ids
+        self._children: List[List[int]] = [] # class id -> direct subclass ids
+        self._members: Dict[int, Dict[str, None]] = {} # class id -> direct instances
+        self._types: Dict[str, Tuple[int, ...]] = {} # instance -> direct type ids
+        self._intervals: Optional[Tuple[List[int], List[int], List[bool]]] = None # (pre, post, exact), None when stale
+        self._owned: Optional[Set[Tuple[str, int]]] = None # (attribute, class id) not shared with a copy; None: all
+
+    @classmethod
+    def build(cls, graph: Graph) -> "ClassHierarchy":
+        index = cls()
+        for s, o in graph.subject_objects(RDFS.subClassOf):
+            index.add(s, RDFS.subClassOf, o)
+        for s, o in graph.subject_objects(RDF.type):
+            index.add(s, RDF.type, o)
+        return index
+
+    def copy(self) -> "ClassHierarchy":
+        clone = ClassHierarchy()
+        clone._classes = self._classes.copy()
+        clone._class_ids = self._class_ids.copy()
+        clone._parents = self._parents.copy()
+        clone._children = self._children.copy()
+        clone._members = self._members.copy()
+        clone._types = self._types.copy()
+        clone._intervals = self._intervals # Replaced, never modified in place
+        self._owned, clone._owned = set(), set()
+        return clone
+
+    def _writable(self, name: str, class_id: int):
+        """The list or dict of class_id in attribute name, copied first if a copy of this index shares it."""
+        container = getattr(self, name)
+        if self._owned is not None and (name, class_id) not in self._owned:
+            container[class_id] = container[class_id].copy()
+            self._owned.add((name, class_id))
+        return container[class_id]
+
+    def _class_id(self, uri: str) -> int:
+        class_id = self._class_ids.get(uri)
+        if class_id is None:
+            uri = sys.intern(uri)
+            class_id = self._class_ids[uri] = len(self._classes)
+            self._classes.append(uri)
+            self._parents.append([])
+            self._children.append([])
+            self._intervals = None
+        return class_id
+
+    def add(self, s, p, o):
+        """Records a single triple. Triples other than subClassOf/type are ignored."""
+        if p == RDFS.subClassOf:
+            sub, sup = self._class_id(str(s)), self._class_id(str(o))
+            if sub == sup or sup in self._parents[sub]:
+                return
+            self._writable("_parents", sub).append(sup)
+            self._writable("_children", sup).append(sub)
+            self._intervals = None
+        elif p == RDF.type:
+            class_id = self._class_id(str(o))
+            key = sys.intern(str(s))
+            self._members.setdefault(class_id, {})
+            self._writable("_members", class_id)[key] = None
+            types = self._types.get(key, ())
+            if class_id not in types:
+                self._types[key] = types + (class_id,)
+
+    def _labelled(self) -> Tuple[List[int], List[int], List[bool]]:
+        """
+        Pre/post-order numbers of a depth-first spanning forest over the subclass edges,
+        and for each class whether its ancestors are exactly its forest ancestors (it
+        is a root, or has a single superclass that is itself exact).
+        """
+        if self._intervals is not None:
+            return self._intervals
+        count = len(self._classes)
+        pre, post, exact = [-1] * count, [0] * count, [False] * count
+        next_pre = next_post = 0
+        roots = [class_id for class_id in range(count) if not self._parents[class_id]]
+        for root in itertools.chain(roots, range(count)): # Then whatever only a cycle reaches
+            if pre[root] >= 0:
+                continue
+            pre[root], next_pre = next_pre, next_pre + 1
+            exact[root] = not self._parents[root]
+            stack = [(root, iter(self._children[root]))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    if pre[child] < 0:
+                        pre[child], next_pre = next_pre, next_pre + 1
+                        exact[child] = exact[node] and len(self._parents[child]) == 1
+                        stack.append((child, iter(self._children[child])))
+                        break
+                else:
+                    post[node], next_post = next_post, next_post + 1
+                    stack.pop()
+        self._intervals = (pre, post, exact)
+        return self._intervals
+
+    def _walk(self, class_id: int, edges: List[List[int]]) -> Dict[int, None]:
+        """Class ids reachable from class_id along edges (including itself), nearest first."""
+        reached = {class_id: None}
+        queue = [class_id]
+        for node in queue:
+            for neighbour in edges[node]:
+                if neighbour not in reached:
+                    reached[neighbour] = None
+                    queue.append(neighbour)
+        return reached
+
+    def _is_subclass_id(self, sub: int, sup: int) -> bool:
+        if sub == sup:
+            return True
+        pre, post, exact = self._labelled()
+        if pre[sup] <= pre[sub] and post[sub] <= post[sup]:
+            return True # sup is a forest ancestor of sub
+        if exact[sub]:
+            return False
+        return sup in self._walk(sub, self._parents)
+
+    def _uris(self, class_ids: Iterable[int], exclude: Optional[int] = None) -> List[str]:
+        return [self._classes[i] for i in class_ids if i != exclude]
+
+    def ancestors(self, uri: str, include_self: bool = False) -> List[str]:
+        """Superclasses of a class (transitively), nearest first."""
+        class_id = self._class_ids.get(uri)
+        if class_id is None:
+            return []
+        return self._uris(self._walk(class_id, self._parents), None if include_self else class_id)
+
+    def descendants(self, uri: str, include_self: bool = False) -> List[str]:
+        """Subclasses of a class (transitively), nearest first."""
+        class_id = self._class_ids.get(uri)
+        if class_id is None:
+            return []
+        return self._uris(self._walk(class_id, self._children), None if include_self else class_id)
+
+    def is_subclass_of(self, sub: str, sup: str) -> bool:
+        """True if sub is sup or one of its (transitive) subclasses."""
+        sub_id, sup_id = self._class_ids.get(sub), self._class_ids.get(sup)
+        if sub_id is None or sup_id is None:
+            return sub == sup
+        return self._is_subclass_id(sub_id, sup_id)
+
+    def is_instance_of(self, entity: str, class_uri: str) -> bool:
+        """True if entity has class_uri or one of its subclasses as an asserted type."""
+        class_id = self._class_ids.get(class_uri)
+        if class_id is None:
+            return False
+        return any(self._is_subclass_id(type_id, class_id) for type_id in self._types.get(entity, ()))
+
+    def instances(self, class_uri: str, include_subclasses: bool = True) -> List[str]:
+        class_id = self._class_ids.get(class_uri)
+        if class_id is None:
+            return []
+        if not include_subclasses:
+            return list(self._members.get(class_id, ()))
+        instances: Dict[str, None] = {}
+        for sub_id in self._walk(class_id, self._children):
+            instances.update(self._members.get(sub_id, ()))
+        return list(instances)
+
+    def instance_count(self, class_uri: str) -> int:
+        """Number of entities with class_uri as an asserted type (without walking them)."""
+        class_id = self._class_ids.get(class_uri)
+        return len(self._members.get(class_id, ())) if class_id is not None else 0
+
+    def least_common_ancestors(self, a: str, b: str) -> List[str]:
+        """Most specific classes that both a and b are subclasses of (several if the hierarchy is a DAG)."""
+        a_id, b_id = self._class_ids.get(a), self._class_ids.get(b)
+        if a_id is None or b_id is None:
+            return []
+        b_ancestors = self._walk(b_id, self._parents)
+        common = [i for i in self._walk(a_id, self._parents) if i in b_ancestors]
+        common_set = set(common)
+        # common is closed upwards, so a class is most specific when no subclass of it is common
+        # (a subclass that is also its superclass, i.e. an equivalence cycle, does not count)
+        return [self._classes[i] for i in common
+                if not any(child in common_set and not self._is_subclass_id(i, child) for child in self._children[i])]
+
+    def __len__(self) -> int:
+        return len(self._classes)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._classes)
@@ -0,0 +1,113 @@
+import json
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tokenization import words
+
+# Dense vectors for every concept (label, local name and comments embedded together), for
+# top-k cosine search without a network round trip. The embedding function is pluggable:
+# anything mapping a list of texts to an (n, dim) float array. The default is a hashing
+# trick over words and character trigrams, which needs no model and works offline but only
+# captures lexical overlap; a local sentence-embedding model can be passed for synonyms.
+# Matrices are saved as .npy next to the ontology snapshot and memory-mapped on load.
+
+Embedder = Callable[[List[str]], np.ndarray]
+
+HASHING_DIM = 256
+
+
+def hashing_embedder(texts: List[str], dim: int = HASHING_DIM) -> np.ndarray:
+    """
+    Signed feature hashing of words (weight 1) and their character trigrams (weight 0.5).
+    crc32 keeps the vectors identical across processes, unlike hash().
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    slots: Dict[str, Tuple[int, float]] = {} # feature -> (column, sign); features repeat a lot
+    for row, text in enumerate(texts):
+        columns, values = [], []
+        for word in words(text):
+            padded = f" {word} "
+            for feature in [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+                slot = slots.get(feature)
+                if slot is None:
+                    h = zlib.crc32(feature.encode("utf-8"))
+                    slot = slots[feature] = (h % dim, 1.0 if h & 0x80000000 else -1.0)
+                columns.append(slot[0])
+                values.append(slot[1] if feature is word else slot[1] * 0.5)
+        if columns:
+            matrix[row] = np.bincount(columns, weights=values, minlength=dim)
+    return matrix
+
+
+def embedder_name(embed: Embedder) -> str:
+    return f"{getattr(embed, '__module__', '')}.{getattr(embed, '__qualname__', type(embed).__name__)}"
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class ConceptEmbeddings:
+    """Row-normalized embedding matrix with the URI of each row."""
+
+    def __init__(self, uris: List[str], matrix: np.ndarray, embed: Embedder):
+        self.uris = uris
+        self.matrix = matrix # (len(uris), dim) float32, unit rows; may be a read-only memmap
+        self.embed = embed
+
+    @classmethod
+    def build(cls, entries: Sequence[Tuple[str, str]], embed: Embedder, batch_size: int = 1024) -> "ConceptEmbeddings":
+        """Embeds (uri, text) pairs in batches."""
+        uris = [uri for uri, _ in entries]
+        batches = [_normalized(embed([text for _, text in entries[i:i + batch_size]]))
+                   for i in range(0, len(entries), batch_size)]
+        matrix = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        return cls(uris, matrix, embed)
+
+    def search(self, texts: List[str], limit: int = 10) -> List[List[Tuple[str, float]]]:
+        """Top-limit (uri, cosine) pairs for each text, best first; all texts in one matrix product."""
+        if not texts or not self.uris:
+            return [[] for _ in texts]
+        scores = _normalized(self.embed(list(texts))) @ self.matrix.T
+        top = min(limit, len(self.uris))
+        best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+        results = []
+        for row, candidates in zip(scores, best):
+            ordered = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([(self.uris[i], float(row[i])) for i in ordered if row[i] > 0])
+        return results
+
+    def save(self, path: str) -> bool:
+        """Writes path (.npy matrix) and path + '.json' (URIs and embedder); the .npy is replaced last."""
+        try:
+            tmp_suffix = f".{os.getpid()}.tmp"
+            with open(path + ".json" + tmp_suffix, "w", encoding="utf-8") as f:
+                json.dump({"embedder": embedder_name(self.embed), "uris": self.uris}, f)
+            with open(path + tmp_suffix, "wb") as f:
+                np.save(f, self.matrix)
+            os.replace(path + ".json" + tmp_suffix, path + ".json")
+            os.replace(path + tmp_suffix, path)
+            return True
+        except OSError as e:
+            print(f"Could not write concept embeddings {path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str, embed: Embedder) -> Optional["ConceptEmbeddings"]:
+        """Memory-maps a saved matrix. Returns None if missing, unreadable or made by another embedder."""
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("embedder") != embedder_name(embed):
+                return None
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if matrix.ndim != 2 or len(matrix) != len(meta["uris"]) or matrix.shape[1] != np.shape(embed([""]))[1]:
+            return None # Partially replaced files, or the embedder's dimension changed
+        return cls(meta["uris"], matrix, embed)
@@ -0,0 +1,120 @@
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF, RDFS
+
+# Importance ranking of an ontology's classes and properties, computed once per load (when
+# first asked for) so prompts can be given the most representative concepts with a slice.
+# Concepts are the nodes of a weighted graph linking subclasses to superclasses, properties
+# to their domain/range classes, and the classes of subjects/objects to the properties used
+# between them. Each concept is scored on PageRank over that graph, its degree in the
+# data and (for classes) its number of direct instances.
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 50
+PAGERANK_TOLERANCE = 1e-9
+# Relative weights of the normalized signals in the final score
+SCORE_WEIGHTS = {"pagerank": 0.5, "degree": 0.25, "instances": 0.25}
+
+
+def pagerank(src: np.ndarray, dst: np.ndarray, weights: np.ndarray, n: int,
+             damping: float = PAGERANK_DAMPING, iterations: int = PAGERANK_ITERATIONS) -> np.ndarray:
+    """Weighted PageRank by power iteration; rank of dangling nodes is spread uniformly."""
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.bincount(src, weights=weights, minlength=n)
+    dangling = out_weight == 0
+    edge_share = weights / np.where(dangling, 1.0, out_weight)[src]
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        spread = np.bincount(dst, weights=rank[src] * edge_share, minlength=n)
+        new_rank = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        converged = np.abs(new_rank - rank).sum() < PAGERANK_TOLERANCE
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+
+class ConceptRanking:
+    """Classes and properties ordered by importance (most important first)."""
+
+    def __init__(self, classes: List[Dict[str, Any]], properties: List[Dict[str, Any]]):
+        self.classes = classes
+        self.properties = properties
+
+    @classmethod
+    def build(cls, graph: Graph, classes: Iterable[str], properties: Iterable[str]) -> "ConceptRanking":
+        nodes: Dict[str, int] = {}
+        for uri in classes:
+            nodes.setdefault(uri, len(nodes))
+        class_count = len(nodes)
+        for uri in properties:
+            nodes.setdefault(uri, len(nodes))
+
+        # Types of every subject/object, so property usage can link the classes involved
+        types: Dict[Any, List[int]] = {}
+        instances = Counter()
+        for s, o in graph.subject_objects(RDF.type):
+            node = nodes.get(str(o))
+            if node is not None:
+                types.setdefault(s, []).append(node)
+                instances[node] += 1
+
+        edges: Counter = Counter()
+        degree = Counter()
+        for s, p, o in graph:
+            p_node = nodes.get(str(p))
+            if p_node is not None:
+                degree[p_node] += 1
+            s_node = nodes.get(str(s)) if isinstance(s, URIRef) else None
+            o_node = nodes.get(str(o)) if isinstance(o, URIRef) else None
+            if s_node is not None:
+                degree[s_node] += 1
+            if o_node is not None:
+                degree[o_node] += 1
+            if p == RDFS.subClassOf and s_node is not None and o_node is not None:
+                edges[(s_node, o_node)] += 1
+            elif p in (RDFS.domain, RDFS.range) and s_node is not None and o_node is not None:
+                edges[(s_node, o_node)] += 1
+                edges[(o_node, s_node)] += 1
+            elif p_node is not None and p_node >= class_count:
+                for type_node in types.get(s, ()):
+                    edges[(type_node, p_node)] += 1
+                for type_node in types.get(o, ()):
+                    edges[(p_node, type_node)] += 1
+
+        n = len(nodes)
+        if edges:
+            pairs = np.array(list(edges.keys()), dtype=np.int64)
+            ranks = pagerank(pairs[:, 0], pairs[:, 1], np.fromiter(edges.values(), dtype=float, count=len(edges)), n)
+        else:
+            ranks = np.full(n, 1.0 / n) if n else np.zeros(0)
+
+        def _normalized(values: Dict[int, float]) -> Dict[int, float]:
+            # Log-scaled so a few huge classes don't flatten everyone else to zero
+            top = max((math.log1p(v) for v in values.values()), default=0.0)
+            return {k: math.log1p(v) / top for k, v in values.items()} if top else {}
+
+        norm_degree, norm_instances = _normalized(degree), _normalized(instances)
+        top_rank = float(ranks.max()) if n else 0.0
+        scored: List[Tuple[float, int, str]] = []
+        for uri, node in nodes.items():
+            score = (SCORE_WEIGHTS["pagerank"] * (float(ranks[node]) / top_rank if top_rank else 0.0)
+                     + SCORE_WEIGHTS["degree"] * norm_degree.get(node, 0.0)
+                     + SCORE_WEIGHTS["instances"] * norm_instances.get(node, 0.0))
+            scored.append((score, node, uri))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        ranked_classes, ranked_properties = [], []
+        for score, node, uri in scored:
+            entry = {"uri": uri, "score": round(score, 4), "degree": degree[node]}
+            if node < class_count:
+                entry["instances"] = instances[node]
+                ranked_classes.append(entry)
+            else:
+                ranked_properties.append(entry)
+        return cls(ranked_classes, ranked_properties)
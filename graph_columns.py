@@ -0,0 +1,129 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF
+
+# Read-only, dictionary-encoded copy of a graph for analytics. Every distinct term gets an
+# integer id and the triples are kept as three NumPy id columns, once sorted in SPO order
+# and once in POS order, so counts and group-bys are vectorized scans or binary searches
+# instead of Python loops over rdflib term objects.
+
+
+def _sorted_range(columns: Tuple[np.ndarray, ...], keys: Tuple[int, ...]) -> Tuple[int, int]:
+    """[start, end) of the rows whose leading columns equal keys, for columns sorted lexicographically."""
+    start, end = 0, len(columns[0])
+    for column, key in zip(columns, keys):
+        segment = column[start:end]
+        start, end = start + int(np.searchsorted(segment, key, "left")), start + int(np.searchsorted(segment, key, "right"))
+        if start == end:
+            break
+    return start, end
+
+
+class ColumnarGraph:
+    """
+    Immutable columnar view of a graph. Build it with ColumnarGraph.build(graph); it does
+    not follow later changes to the graph.
+    """
+
+    def __init__(self, terms: List[Any], s: np.ndarray, p: np.ndarray, o: np.ndarray):
+        self.terms = terms # id -> rdflib term
+        self.ids = {term: term_id for term_id, term in enumerate(terms)}
+        spo = np.lexsort((o, p, s))
+        self.spo = (s[spo], p[spo], o[spo])
+        pos = np.lexsort((s, o, p))
+        self.pos = (p[pos], o[pos], s[pos])
+
+    @classmethod
+    def build(cls, graph: Graph) -> "ColumnarGraph":
+        ids: Dict[Any, int] = {}
+        terms: List[Any] = []
+
+        def _intern(term) -> int:
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = len(terms)
+                terms.append(term)
+            return term_id
+
+        flat = np.fromiter((_intern(term) for triple in graph for term in triple), dtype=np.int64, count=3 * len(graph))
+        dtype = np.int32 if len(terms) < 2 ** 31 else np.int64
+        columns = flat.astype(dtype, copy=False).reshape(-1, 3)
+        return cls(terms, columns[:, 0].copy(), columns[:, 1].copy(), columns[:, 2].copy())
+
+    def __len__(self) -> int:
+        return len(self.spo[0])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the id columns (the term table is shared with the source graph)."""
+        return sum(column.nbytes for column in self.spo + self.pos)
+
+    def term_id(self, term) -> Optional[int]:
+        return self.ids.get(term)
+
+    def _ids(self, terms: Iterable) -> np.ndarray:
+        return np.array([self.ids[t] for t in terms if t in self.ids], dtype=self.spo[0].dtype)
+
+    def _match(self, s=None, p=None, o=None) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(s, p, o) id columns of the triples matching a pattern, or None if a bound term is unknown."""
+        bound = [None if term is None else self.ids.get(term, -1) for term in (s, p, o)]
+        if -1 in bound:
+            return None
+        s_id, p_id, o_id = bound
+        if s_id is not None:
+            keys = (s_id,) if p_id is None else (s_id, p_id) if o_id is None else (s_id, p_id, o_id)
+            start, end = _sorted_range(self.spo, keys)
+            columns = tuple(column[start:end] for column in self.spo)
+            if p_id is None and o_id is not None:
+                mask = columns[2] == o_id
+                columns = tuple(column[mask] for column in columns)
+            return columns
+        if p_id is not None:
+            start, end = _sorted_range(self.pos, (p_id,) if o_id is None else (p_id, o_id))
+            p_col, o_col, s_col = (column[start:end] for column in self.pos)
+            return s_col, p_col, o_col
+        if o_id is not None:
+            mask = self.spo[2] == o_id
+            return tuple(column[mask] for column in self.spo)
+        return self.spo
+
+    def count(self, s=None, p=None, o=None) -> int:
+        """Number of triples matching a pattern (None is a wildcard)."""
+        columns = self._match(s, p, o)
+        return 0 if columns is None else len(columns[0])
+
+    def _group_counts(self, ids: np.ndarray) -> Dict[str, int]:
+        if not len(ids):
+            return {}
+        values, counts = np.unique(ids, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return {str(self.terms[values[i]]): int(counts[i]) for i in order}
+
+    def distinct_counts(self) -> Dict[str, int]:
+        """Number of distinct subjects, predicates and objects."""
+        s, p, o = self.spo
+        return {"subjects": len(np.unique(s)), "predicates": len(np.unique(p)), "objects": len(np.unique(o))}
+
+    def predicate_counts(self) -> Dict[str, int]:
+        """Triples per predicate, most frequent first."""
+        return self._group_counts(self.pos[0])
+
+    def instance_counts(self, classes: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Direct rdf:type instances per class, most frequent first (optionally limited to `classes`)."""
+        columns = self._match(p=RDF.type)
+        if columns is None:
+            return {}
+        types = columns[2]
+        if classes is not None:
+            types = types[np.isin(types, self._ids(URIRef(c) for c in classes))]
+        return self._group_counts(types)
+
+    def degree_distribution(self, direction: str = "out") -> Dict[int, int]:
+        """Maps a degree to the number of nodes with that many outgoing ("out") or incoming ("in") triples."""
+        ids = self.spo[0] if direction == "out" else self.spo[2]
+        if not len(ids):
+            return {}
+        degrees = np.bincount(np.unique(ids, return_counts=True)[1])
+        return {int(degree): int(nodes) for degree, nodes in enumerate(degrees) if nodes}
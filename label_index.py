@@ -0,0 +1,191 @@
+import bisect
+import re
+import sys
+from collections.abc import ItemsView, Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from tokenization import normalize_label
+
+# Two-way index between entities and their labels, and a read-only mapping view over it.
+
+# Label predicates in order of preference; the URI fragment is the last resort
+LABEL_PREDICATES = (RDFS.label, SKOS.prefLabel, SKOS.altLabel)
+_LABEL_KIND_FRAGMENT = len(LABEL_PREDICATES)
+def uri_fragment(uri: str) -> str:
+    """Returns the local name of a URI (the part after '#' or the last '/')."""
+    return re.split(r"[#/:]", uri.rstrip("/#"))[-1]
+
+def _bucket_add(bucket: Union[None, int, tuple], value: int) -> Union[int, tuple]:
+    # Single values are stored bare; tuples only appear once a key has several values
+    if bucket is None:
+        return value
+    if isinstance(bucket, int):
+        return bucket if bucket == value else (bucket, value)
+    return bucket if value in bucket else bucket + (value,)
+
+def _bucket_values(bucket: Union[None, int, tuple]) -> tuple:
+    if bucket is None:
+        return ()
+    return (bucket,) if isinstance(bucket, int) else bucket
+
+
+class LabelIndex:
+    """
+    Two-way index between entity URIs and their labels (rdfs:label, skos:prefLabel,
+    skos:altLabel and the URI fragment).
+
+    URIs and label strings are interned to integer ids. Each URI keeps its labels as
+    packed ints (label_id * 4 + kind), and normalized label keys map back to URI ids,
+    with a lazily sorted key list for prefix search.
+    """
+    PREDICATES = (RDF.type,) + LABEL_PREDICATES
+
+    def __init__(self):
+        self._uris: List[str] = []
+        self._uri_ids: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._label_ids: Dict[str, int] = {}
+        self._uri_entries: List[Union[None, int, tuple]] = [] # uri id -> packed label entries
+        self._by_key: Dict[str, Union[int, tuple]] = {} # normalized label -> uri ids
+        self._sorted_keys: List[str] = []
+        self._sorted_dirty = False
+        self._labelled_count = 0 # URIs with at least one real (non-fragment) label
+
+    @classmethod
+    def build(cls, graph: Graph) -> "LabelIndex":
+        index = cls()
+        for pred in LABEL_PREDICATES:
+            for s, o in graph.subject_objects(pred):
+                index.add(s, pred, o)
+        for s in graph.subjects(RDF.type, None, unique=True):
+            index.add_entity(s)
+        return index
+
+    def copy(self) -> "LabelIndex":
+        """Independent copy (containers are copied; their int/str/tuple contents are immutable)."""
+        clone = LabelIndex()
+        for name, value in vars(self).items():
+            setattr(clone, name, value.copy() if isinstance(value, (list, dict)) else value)
+        return clone
+
+    def _uri_id(self, uri: str) -> int:
+        uri_id = self._uri_ids.get(uri)
+        if uri_id is None:
+            uri = sys.intern(uri)
+            uri_id = self._uri_ids[uri] = len(self._uris)
+            self._uris.append(uri)
+            self._uri_entries.append(None)
+            self._add_entry(uri_id, uri_fragment(uri), _LABEL_KIND_FRAGMENT)
+        return uri_id
+
+    def _add_entry(self, uri_id: int, label: str, kind: int):
+        if not label:
+            return
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self._labels)
+            self._labels.append(label)
+        entries = self._uri_entries[uri_id]
+        if kind != _LABEL_KIND_FRAGMENT and not any(e % 4 != _LABEL_KIND_FRAGMENT for e in _bucket_values(entries)):
+            self._labelled_count += 1
+        self._uri_entries[uri_id] = _bucket_add(entries, label_id * 4 + kind)
+        key = normalize_label(label)
+        if key not in self._by_key:
+            self._sorted_dirty = True
+        self._by_key[key] = _bucket_add(self._by_key.get(key), uri_id)
+
+    def add_entity(self, s):
+        """Registers a named entity so it is findable by its URI fragment."""
+        if isinstance(s, URIRef):
+            self._uri_id(str(s))
+
+    def add(self, s, p, o):
+        """Indexes a single triple if it is a label assertion on a named entity."""
+        if not isinstance(s, URIRef):
+            return
+        if p == RDF.type:
+            self._uri_id(str(s))
+        elif p in LABEL_PREDICATES and isinstance(o, Literal):
+            self._add_entry(self._uri_id(str(s)), str(o), LABEL_PREDICATES.index(p))
+
+    def labels_for(self, uri: str, include_fragment: bool = True) -> List[str]:
+        """Returns the labels of a URI, preferred label first."""
+        uri_id = self._uri_ids.get(uri)
+        if uri_id is None:
+            return []
+        entries = sorted(_bucket_values(self._uri_entries[uri_id]), key=lambda e: e % 4)
+        labels = (self._labels[e // 4] for e in entries if include_fragment or e % 4 != _LABEL_KIND_FRAGMENT)
+        return list(dict.fromkeys(labels))
+
+    def preferred_label(self, uri: str) -> Optional[str]:
+        labels = self.labels_for(uri, include_fragment=False)
+        return labels[0] if labels else None
+
+    def lookup(self, text: str, mode: str = "normalized", limit: Optional[int] = None) -> List[str]:
+        """
+        Finds URIs by label. Modes: 'exact' (same string), 'normalized' (case and
+        whitespace insensitive) or 'prefix' (normalized label starts with text).
+        """
+        key = normalize_label(text)
+        if mode == "prefix":
+            if self._sorted_dirty:
+                self._sorted_keys = sorted(self._by_key)
+                self._sorted_dirty = False
+            uri_ids: Dict[int, None] = {}
+            start = bisect.bisect_left(self._sorted_keys, key)
+            for k in self._sorted_keys[start:]:
+                if not k.startswith(key) or (limit is not None and len(uri_ids) >= limit):
+                    break
+                uri_ids.update(dict.fromkeys(_bucket_values(self._by_key[k])))
+            result = [self._uris[i] for i in uri_ids]
+        else:
+            result = [self._uris[i] for i in _bucket_values(self._by_key.get(key))]
+            if mode == "exact":
+                result = [uri for uri in result if text in self.labels_for(uri)]
+        return result if limit is None else result[:limit]
+
+    def __len__(self) -> int:
+        return self._labelled_count
+
+    def iter_labels(self) -> Iterator[Tuple[str, str]]:
+        """Yields (uri, label) for every label, URI fragments included."""
+        for uri_id, entries in enumerate(self._uri_entries):
+            for e in _bucket_values(entries):
+                yield self._uris[uri_id], self._labels[e // 4]
+
+    def iter_preferred(self) -> Iterator[Tuple[str, str]]:
+        """Yields (uri, preferred label) for every URI with a real label."""
+        for uri_id, entries in enumerate(self._uri_entries):
+            real = [e for e in _bucket_values(entries) if e % 4 != _LABEL_KIND_FRAGMENT]
+            if real:
+                yield self._uris[uri_id], self._labels[min(real, key=lambda e: e % 4) // 4]
+
+
+class LabelsView(Mapping):
+    """Read-only URI -> preferred label mapping backed directly by a LabelIndex."""
+    def __init__(self, index: LabelIndex):
+        self._index = index
+
+    def __getitem__(self, uri: str) -> str:
+        label = self._index.preferred_label(uri)
+        if label is None:
+            raise KeyError(uri)
+        return label
+
+    def __iter__(self) -> Iterator[str]:
+        return (uri for uri, _ in self._index.iter_preferred())
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def items(self) -> ItemsView:
+        return _LabelItemsView(self)
+
+
+class _LabelItemsView(ItemsView):
+    def __iter__(self):
+        # Single pass over the index instead of a lookup per key
+        return self._mapping._index.iter_preferred()
@@ -87,6 +87,7 @@ def interpret_request(user_input: str, context: Dict[str, Any], conversation_his
     - assess_gaps: Compare document terms to the ontology. Needs parameter 'target_document' (filename or 'all').
     - generate_ontology_business_summary: Generate a business-focused summary of the loaded ontology. No parameters needed.
     - query_ontology: Query the ontology based on a description. Needs parameter 'query_description' (user's topic).
+    - search_ontology: Find concepts whose labels or descriptions mention some keywords (e.g. "find concepts mentioning invoice"). Needs parameter 'keywords'.
     - explain_ontology_concept: Explain a specific concept from the ontology. Needs parameter 'concept_term' or 'concept_uri'.
     - align_entity: Suggest ontology alignments for a given text term. Needs parameter 'entity_to_align'.
     - suggest_ontology_modification: User wants to add/change something in the ontology. Needs parameter 'raw_request'. (Experimental)
@@ -175,35 +176,29 @@ def perform_extraction_llm(text: str, extraction_type: str) -> Any:
         return f"[LLM Placeholder Error] Unknown extraction type: {extraction_type}"
 
 
-def assess_knowledge_gaps_llm(extracted_terms: List[Dict], ontology_classes: List[str], ontology_individuals: List[str], ontology_labels: Dict[str, str]) -> Dict[str, Any]:
+def assess_knowledge_gaps_llm(ambiguous_terms: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    [LLM Placeholder] Compares extracted terms to ontology elements to find gaps.
+    [LLM Placeholder] Decides, for terms with no deterministic match in the ontology, whether
+    each is a variant of one of its candidate concepts or a genuine gap. Terms that match a
+    label exactly, after normalization or as an acronym never reach this call (see
+    OntologyProcessor.match_terms); callers pass at most a batch of the rest at a time.
+    Each term is {"term", "term_type", "context", "candidates": [{"uri", "label", "score"}...]}.
     """
-    # Prepare limited context for the prompt (avoid excessive length)
-    sample_terms = extracted_terms[:50] # Limit number of terms sent
-    sample_classes = ontology_classes[:50]
-    sample_individuals = ontology_individuals[:50]
-    sample_labels = {k:v for i, (k,v) in enumerate(ontology_labels.items()) if i < 100} # Limit labels
-
     prompt = f"""
     You are a knowledge engineer analyzing potential gaps between terms extracted from documents and an existing ontology.
+    Each term below has no exact, case/plural-insensitive or acronym match among the ontology's labels; the listed
+    candidates are the concepts with the most similar labels.
 
-    Ontology Concepts (Sample):
-    - Classes: {json.dumps(sample_classes, indent=2)}
-    - Individuals: {json.dumps(sample_individuals, indent=2)}
-    - Labels (URI -> Label): {json.dumps(sample_labels, indent=2)}
-
-    Extracted Terms from Document(s) (Sample with context):
-    {json.dumps(sample_terms, indent=2)}
+    Terms (with context and candidate concepts):
+    {json.dumps(ambiguous_terms, indent=2)}
 
     Your Task:
-    Compare the 'text' of each extracted term against the provided ontology concepts (URIs, fragments, and labels).
-    Identify terms that are:
-    1.  'Not Found': The exact term (case-insensitive) doesn't appear to match any known concept label or URI fragment.
-    2.  'Potential Variant/Related': The term seems similar (e.g., plural, different tense, acronym, substring match) to an existing concept, suggesting a possible relationship or missing synonym.
+    For each term, decide whether it is:
+    1.  'Potential Variant/Related': a spelling variant, synonym or closely related form of one candidate (name it in "suggestion").
+    2.  'Not Found': none of the candidates fits; the ontology is missing this concept.
 
     Return a JSON object with two keys:
-    - "gaps_found": A list of JSON objects, where each object represents a potential gap and includes keys: "term", "term_type", "context" (from input), "status" ('Not Found' or 'Potential Variant/Related'), "suggestion" (brief action recommendation), "confidence" (0.0-1.0).
+    - "gaps_found": A list of JSON objects, one per term, with keys: "term", "term_type", "context" (from input), "status" ('Not Found' or 'Potential Variant/Related'), "suggestion" (brief action recommendation), "confidence" (0.0-1.0).
     - "summary": A brief (1-2 sentence) textual summary of the findings (e.g., number of gaps, types of gaps).
 
     JSON Response:
@@ -261,29 +256,26 @@ def generate_concept_explanation_llm(concept_details: Dict) -> str:
     return _llm_api_call_placeholder(prompt, expected_output)
 
 
-def suggest_alignment_llm(entity_text: str, ontology_classes: List[str], ontology_individuals: List[str], ontology_labels: Dict[str, str]) -> Dict[str, Any]:
+def suggest_alignment_llm(entity_text: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    [LLM Placeholder] Suggests ontology alignment candidates for a given text entity.
+    [LLM Placeholder] Re-ranks locally generated alignment candidates for a given text entity.
+    candidates are {"uri", "label", "type", "score", "matched", "source"} dicts from
+    OntologyProcessor.get_alignment_candidates.
     """
-    # Limit context size for prompt
-    sample_classes = ontology_classes[:50]
-    sample_individuals = ontology_individuals[:50]
-    sample_labels = {k:v for i, (k,v) in enumerate(ontology_labels.items()) if i < 100}
-
     prompt = f"""
-    Given the text entity "{entity_text}", find the best matching concepts (Classes or Individuals) from the provided ontology sample.
-    Consider exact matches, partial matches, and potential semantic similarity between the entity text and the ontology concept labels or URI fragments.
+    Given the text entity "{entity_text}", re-rank the candidate ontology concepts (Classes or Individuals) below.
+    They were found by similarity over all concepts: "source" is "lexical" (label or URI fragment spelling;
+    "matched" is the label that matched) or "embedding" (label and description vectors), and "score" is that
+    similarity. Consider semantic fit, not just spelling.
 
-    Ontology Concepts (Sample):
-    - Classes: {json.dumps(sample_classes)}
-    - Individuals: {json.dumps(sample_individuals)}
-    - Labels (URI -> Label): {json.dumps(sample_labels)}
+    Candidates:
+    {json.dumps(candidates, indent=2)}
 
     Your Task:
     Return a JSON object with two keys:
     - "entity_text": The original entity text provided.
-    - "suggestions": A list of the top 5 potential matches (JSON objects). Each object should have:
-        - "uri": The URI of the matched ontology concept.
+    - "suggestions": Up to 5 of the candidates (JSON objects), best match first. Each object should have:
+        - "uri": The URI of the candidate (only URIs from the list above).
         - "label": A display label (e.g., "Ontology Label (Type)" or the URI fragment if no label).
         - "type": The type of the concept ('Class' or 'Individual').
         - "score": A confidence score (0.0 to 1.0) indicating the match quality.
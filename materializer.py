@@ -0,0 +1,144 @@
+from typing import Iterable, Iterator, List, Set, Tuple
+
+from rdflib import Graph, Literal
+from rdflib.namespace import OWL, RDF, RDFS
+
+from overlay_store import UnionStore
+
+# Forward-chaining materialization of a practical RDFS / OWL-RL subset:
+#   rdfs2/3 (domain, range), rdfs5/7 (subPropertyOf), rdfs9/11 (subClassOf),
+#   owl:inverseOf, owl:SymmetricProperty, owl:TransitiveProperty,
+#   owl:equivalentClass and owl:equivalentProperty.
+# Evaluation is semi-naive: every round only joins the triples derived in the previous
+# round against what is already known, so adding triples later derives just their
+# consequences instead of recomputing the whole closure. Inferred triples are kept in a
+# separate graph; `graph` is a read-only union of the asserted and inferred triples.
+
+Triple = Tuple
+
+
+class Materializer:
+    def __init__(self, asserted: Graph):
+        self.asserted = asserted
+        self.inferred = Graph()
+        self.graph = Graph(store=UnionStore(asserted.store, self.inferred.store))
+
+    def rebase(self, asserted: Graph):
+        """Points at a new asserted graph holding the same triples (e.g. a copy-on-write overlay)."""
+        self.asserted = asserted
+        self.graph = Graph(store=UnionStore(asserted.store, self.inferred.store))
+
+    def __len__(self) -> int:
+        return len(self.inferred)
+
+    def _has(self, triple: Triple) -> bool:
+        return triple in self.asserted or triple in self.inferred
+
+    def _objects(self, s, p) -> Iterator:
+        yield from self.asserted.objects(s, p)
+        yield from self.inferred.objects(s, p)
+
+    def _subjects(self, p, o) -> Iterator:
+        yield from self.asserted.subjects(p, o)
+        yield from self.inferred.subjects(p, o)
+
+    def _pairs(self, p) -> Iterator[Tuple]:
+        yield from self.asserted.subject_objects(p)
+        yield from self.inferred.subject_objects(p)
+
+    def materialize(self) -> int:
+        """Computes the full closure of the asserted graph. Returns the number of inferred triples."""
+        self.inferred.remove((None, None, None))
+        self._saturate(list(self.asserted))
+        return len(self.inferred)
+
+    def add(self, triples: Iterable[Triple]) -> List[Triple]:
+        """
+        Derives the consequences of triples that were just added to the asserted graph.
+        Returns the newly inferred triples.
+        """
+        delta = []
+        for triple in triples:
+            if triple in self.inferred:
+                self.inferred.remove(triple) # Now asserted; its consequences are already known
+            else:
+                delta.append(triple)
+        return self._saturate(delta)
+
+    def _saturate(self, delta: List[Triple]) -> List[Triple]:
+        derived_all: List[Triple] = []
+        while delta:
+            new: Set[Triple] = set()
+            for triple in delta:
+                for derived in self._apply_rules(triple):
+                    if not isinstance(derived[0], Literal) and derived not in new and not self._has(derived):
+                        new.add(derived)
+            self.inferred.addN((s, p, o, self.inferred) for s, p, o in new)
+            derived_all.extend(new)
+            delta = list(new)
+        return derived_all
+
+    def _apply_rules(self, triple: Triple) -> Iterator[Triple]:
+        s, p, o = triple
+        # Schema triples: join against the data/schema they apply to
+        if p == RDFS.subClassOf:
+            for sup in self._objects(o, RDFS.subClassOf):
+                yield (s, RDFS.subClassOf, sup)
+            for sub in self._subjects(RDFS.subClassOf, s):
+                yield (sub, RDFS.subClassOf, o)
+            for x in self._subjects(RDF.type, s):
+                yield (x, RDF.type, o)
+        elif p == RDFS.subPropertyOf:
+            for sup in self._objects(o, RDFS.subPropertyOf):
+                yield (s, RDFS.subPropertyOf, sup)
+            for sub in self._subjects(RDFS.subPropertyOf, s):
+                yield (sub, RDFS.subPropertyOf, o)
+            for x, y in self._pairs(s):
+                yield (x, o, y)
+        elif p == RDFS.domain:
+            for x, _ in self._pairs(s):
+                yield (x, RDF.type, o)
+        elif p == RDFS.range:
+            for _, y in self._pairs(s):
+                yield (y, RDF.type, o)
+        elif p == OWL.inverseOf:
+            for x, y in self._pairs(s):
+                yield (y, o, x)
+            for x, y in self._pairs(o):
+                yield (y, s, x)
+        elif p == OWL.equivalentClass:
+            yield (s, RDFS.subClassOf, o)
+            yield (o, RDFS.subClassOf, s)
+        elif p == OWL.equivalentProperty:
+            yield (s, RDFS.subPropertyOf, o)
+            yield (o, RDFS.subPropertyOf, s)
+        elif p == RDF.type:
+            for sup in self._objects(o, RDFS.subClassOf):
+                yield (s, RDF.type, sup)
+            if o == OWL.SymmetricProperty:
+                for x, y in self._pairs(s):
+                    yield (y, s, x)
+            elif o == OWL.TransitiveProperty:
+                for x, y in self._pairs(s):
+                    for z in self._objects(y, s):
+                        yield (x, s, z)
+
+        # Any triple: apply the schema already known for its predicate
+        for sup in self._objects(p, RDFS.subPropertyOf):
+            yield (s, sup, o)
+        for cls in self._objects(p, RDFS.domain):
+            yield (s, RDF.type, cls)
+        for cls in self._objects(p, RDFS.range):
+            yield (o, RDF.type, cls)
+        for inverse in self._objects(p, OWL.inverseOf):
+            yield (o, inverse, s)
+        for inverse in self._subjects(OWL.inverseOf, p):
+            yield (o, inverse, s)
+        for characteristic in self._objects(p, RDF.type):
+            if characteristic == OWL.SymmetricProperty:
+                yield (o, p, s)
+            elif characteristic == OWL.TransitiveProperty:
+                for z in self._objects(o, p):
+                    yield (s, p, z)
+                for x in self._subjects(p, s):
+                    yield (x, p, o)
@@ -1,24 +1,841 @@
+import io
+import os
+import re
+import itertools
+import pickle
+import tempfile
+import uuid
+import threading
+import weakref
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import hashlib
+from array import array
 import rdflib
-from rdflib import Graph, URIRef, Literal, Namespace
-from rdflib.namespace import RDF, RDFS, OWL
-from typing import List, Tuple, Optional, Dict, Any
+from rdflib import Graph, Dataset, URIRef, Literal, Namespace, BNode
+from rdflib.namespace import RDF, RDFS, OWL, SKOS, XSD, NamespaceManager
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.compare import to_canonical_graph
+from typing import IO, List, Tuple, Optional, Dict, Any, Callable, Iterable, Iterator, Union
+
+from sparql_cache import QueryResultCache, PreparedQueryCache, normalize_query, estimate_result_size
+from sparql_workers import QueryCancelledError, SparqlWorkerPool
+from sqlite_store import SQLiteStore, open_sqlite_graph
+from overlay_store import OverlayStore
+from graph_columns import ColumnarGraph
+from materializer import Materializer
+from concept_ranking import ConceptRanking
+from change_journal import ChangeJournal, JournalLockedError
+from concept_embeddings import ConceptEmbeddings, Embedder, hashing_embedder
+from term_matcher import TermMatcher
+from query_planner import QueryStatistics, reorder_query, pattern_iris, cartesian_products, has_limit
+from class_index import NON_INDIVIDUAL_TYPES, ClassificationIndex, ClassHierarchy
+from label_index import LABEL_PREDICATES, LabelIndex, LabelsView, uri_fragment
+from text_index import TEXT_PREDICATE_WEIGHTS, TextIndex, NgramIndex
+from tokenization import text_tokens
+
+# --- Snapshot cache ---
+# Parsed ontologies are stored as a pickled term table plus a flat integer array of
+# (s, p, o) term ids. Loading that back is much cheaper than re-tokenizing Turtle.
+SNAPSHOT_MAGIC = b"RAGUI-ONTO-SNAP"
+SNAPSHOT_VERSION = 4 # Bump when the snapshot layout or a persisted index class changes
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ragui", "ontology_journals")
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ragui", "ontology_snapshots")
+
+# --- Parallel parsing ---
+# Line-oriented formats can be split at line boundaries and parsed chunk by chunk in
+# separate processes. Smaller files are parsed serially (process start-up dominates).
+LINE_FORMATS = {"nt": "nt", "ntriples": "nt", "nt11": "nt", "nquads": "nquads", "nq": "nquads"}
+PARALLEL_PARSE_MIN_BYTES = 16 * 1024 * 1024
+PARALLEL_CHUNK_BYTES = 8 * 1024 * 1024
+
+class _LabelledBNodes(dict):
+    """bnode_context that maps a blank node label to the same BNode in every chunk/process."""
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def get(self, label, default=None):
+        return BNode(f"{self.prefix}{label}")
+
+def _split_line_chunks(file_path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Splits a file into (start, end) byte ranges of roughly chunk_bytes, ending on line boundaries."""
+    size = os.path.getsize(file_path)
+    chunks = []
+    with open(file_path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline() # Advance to the end of the current line
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+def _parse_line_chunk(file_path: str, start: int, end: int, rdf_format: str, bnode_prefix: str) -> Tuple[List[tuple], bytes]:
+    """Process-pool task: parses one byte range of an N-Triples/N-Quads file to encoded triples."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8")
+    bnodes = _LabelledBNodes(bnode_prefix)
+    if rdf_format == "nquads":
+        dataset = Dataset()
+        dataset.parse(data=data, format="nquads", bnode_context=bnodes)
+        triples = ((s, p, o) for s, p, o, _ in dataset.quads((None, None, None, None)))
+    else:
+        graph = Graph()
+        graph.parse(data=data, format="nt", bnode_context=bnodes)
+        triples = iter(graph)
+    return _encode_triples(triples)
+
+# --- Storage backends ---
+# "memory": rdflib's in-memory store (default). "sqlite": an on-disk SQLiteStore built
+# once per source file and then opened read-only by every session; a session's edits go
+# to an in-memory overlay, so the store always matches its source file.
+STORAGE_BACKENDS = ("memory", "sqlite")
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ragui", "ontology_stores")
+
+_TERM_URI, _TERM_BNODE, _TERM_LITERAL = 0, 1, 2
+
+def _encode_term(term) -> tuple:
+    """Encodes an RDFLib term as a plain tuple (kind, lexical[, datatype, lang])."""
+    if isinstance(term, Literal):
+        return (_TERM_LITERAL, str(term), str(term.datatype) if term.datatype else None, term.language)
+    if isinstance(term, BNode):
+        return (_TERM_BNODE, str(term))
+    return (_TERM_URI, str(term))
+
+def _decode_term(encoded: tuple):
+    """Inverse of _encode_term."""
+    kind = encoded[0]
+    if kind == _TERM_LITERAL:
+        _, lexical, datatype, lang = encoded
+        return Literal(lexical, lang=lang, datatype=URIRef(datatype) if datatype else None)
+    if kind == _TERM_BNODE:
+        return BNode(encoded[1])
+    return URIRef(encoded[1])
+
+def _encode_triples(triples: Iterable[Tuple]) -> Tuple[List[tuple], bytes]:
+    """Encodes triples as (term table, flat int64 id array bytes)."""
+    term_ids: Dict[Any, int] = {}
+    terms = []
+    ids = array("q")
+    for triple in triples:
+        for term in triple:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(terms)
+                terms.append(_encode_term(term))
+            ids.append(term_id)
+    return terms, ids.tobytes()
+
+def _decode_triples(terms: List[tuple], id_bytes: bytes, interned: Optional[Dict[tuple, Any]] = None) -> Iterator[Tuple]:
+    """
+    Inverse of _encode_triples. interned maps encoded terms to terms already decoded
+    (filled as it goes), so several tables share one object per term.
+    """
+    if interned is None:
+        decoded = [_decode_term(t) for t in terms]
+    else:
+        decoded = [interned[t] if t in interned else interned.setdefault(t, _decode_term(t)) for t in terms]
+    ids = array("q")
+    ids.frombytes(id_bytes)
+    if len(ids) % 3:
+        raise ValueError("truncated triple table")
+    return ((decoded[s], decoded[p], decoded[o]) for s, p, o in zip(ids[0::3], ids[1::3], ids[2::3]))
+
+def _close_worker_pool(pool: SparqlWorkerPool, snapshot_path: Optional[str]):
+    pool.close()
+    if snapshot_path:
+        try:
+            os.remove(snapshot_path)
+        except OSError:
+            pass
+
+def _file_stamp(file_path: str) -> Optional[Tuple[int, int]]:
+    """(size, mtime) of a file, used to tell whether it changed since it was loaded."""
+    try:
+        stat = os.stat(file_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+# Content hashes of source files, per path with the (size, mtime) they were taken at;
+# a file is read again only once its stamp changes
+_FILE_DIGESTS: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_FILE_DIGESTS_LOCK = threading.Lock()
+
+def _file_sha256(file_path: str) -> str:
+    path, stamp = os.path.abspath(file_path), _file_stamp(file_path)
+    with _FILE_DIGESTS_LOCK:
+        cached = _FILE_DIGESTS.get(path)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    if stamp is not None and stamp == _file_stamp(file_path): # Not modified while it was read
+        with _FILE_DIGESTS_LOCK:
+            _FILE_DIGESTS[path] = (stamp, digest.hexdigest())
+    return digest.hexdigest()
+
+
+# --- Delta reload ---
+# Blank nodes get new ids on every parse, so triples containing them are diffed by
+# component: the triples linked through shared blank nodes (an OWL restriction, an
+# rdf:List, with the named triple pointing at it). Each component is reduced to a
+# signature independent of the blank node ids, and only components whose signature
+# appears on one side are added or removed.
+
+def _bnode_components(triples: Iterable[Tuple]) -> List[List[Tuple]]:
+    """Groups triples with blank nodes into components connected through those blank nodes."""
+    parent: Dict[BNode, BNode] = {}
+
+    def _root(node: BNode) -> BNode:
+        while parent[node] is not node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    triples = list(triples)
+    for triple in triples:
+        nodes = [term for term in triple if isinstance(term, BNode)]
+        for node in nodes:
+            parent.setdefault(node, node)
+        for node in nodes[1:]:
+            parent[_root(node)] = _root(nodes[0])
+    components: Dict[BNode, List[Tuple]] = {}
+    for triple in triples:
+        node = next(term for term in triple if isinstance(term, BNode))
+        components.setdefault(_root(node), []).append(triple)
+    return list(components.values())
+
+def _component_signature(triples: List[Tuple]) -> str:
+    """
+    A string equal for two components exactly when they are isomorphic. Tree-shaped
+    components (every blank node referenced at most once, the usual shape) are described
+    bottom-up; anything else falls back to rdflib's canonical labelling.
+    """
+    children: Dict[BNode, List[Tuple]] = {}
+    referenced: Dict[BNode, int] = {}
+    for s, p, o in triples:
+        if isinstance(s, BNode):
+            children.setdefault(s, []).append((p, o))
+        if isinstance(o, BNode):
+            referenced[o] = referenced.get(o, 0) + 1
+    nodes = set(children) | set(referenced)
+    nested = {o for pairs in children.values() for _, o in pairs if isinstance(o, BNode)}
+    order = [node for node in nodes if node not in nested]
+    for node in order: # Breadth-first from the blank nodes no other blank node refers to
+        order.extend(o for _, o in children.get(node, ()) if isinstance(o, BNode))
+    if len(order) != len(nodes) or any(count > 1 for count in referenced.values()):
+        graph = Graph()
+        graph.addN((s, p, o, graph) for s, p, o in triples)
+        return "\n".join(sorted(_nt_line(triple) for triple in to_canonical_graph(graph)))
+    described: Dict[BNode, str] = {}
+    for node in reversed(order): # Children before their parents
+        described[node] = "[" + ";".join(sorted(
+            f"{p.n3()} {described[o] if isinstance(o, BNode) else o.n3()}" for p, o in children.get(node, ()))) + "]"
+    lines = [f"{s.n3()} {p.n3()} {described[o]}" for s, p, o in triples if not isinstance(s, BNode)]
+    lines.extend(described[node] for node in nodes if node not in referenced)
+    return "\n".join(sorted(lines))
+
+
+# Characters that may not appear in an IRI
+_INVALID_URI_RE = re.compile(r'[<>"{}|\\^`\s]')
+
+# Formats supported by export_ontology, and lines buffered per write
+EXPORT_FORMATS = ("nt", "turtle")
+EXPORT_BATCH_LINES = 1000
+# Prefixes rdflib binds on every new Graph; Turtle exports declare them only when used
+RDFLIB_DEFAULT_PREFIXES = {
+    "brick": "https://brickschema.org/schema/Brick#", "csvw": "http://www.w3.org/ns/csvw#",
+    "dc": "http://purl.org/dc/elements/1.1/", "dcat": "http://www.w3.org/ns/dcat#",
+    "dcmitype": "http://purl.org/dc/dcmitype/", "dcterms": "http://purl.org/dc/terms/",
+    "dcam": "http://purl.org/dc/dcam/", "doap": "http://usefulinc.com/ns/doap#",
+    "foaf": "http://xmlns.com/foaf/0.1/", "geo": "http://www.opengis.net/ont/geosparql#",
+    "odrl": "http://www.w3.org/ns/odrl/2/", "org": "http://www.w3.org/ns/org#",
+    "prof": "http://www.w3.org/ns/dx/prof/", "prov": "http://www.w3.org/ns/prov#",
+    "qb": "http://purl.org/linked-data/cube#", "schema": "https://schema.org/",
+    "sh": "http://www.w3.org/ns/shacl#", "skos": "http://www.w3.org/2004/02/skos/core#",
+    "sosa": "http://www.w3.org/ns/sosa/", "ssn": "http://www.w3.org/ns/ssn/",
+    "time": "http://www.w3.org/2006/time#", "vann": "http://purl.org/vocab/vann/",
+    "void": "http://rdfs.org/ns/void#", "wgs": "https://www.w3.org/2003/01/geo/wgs84_pos#",
+    "owl": str(OWL), "rdf": str(RDF), "rdfs": str(RDFS), "xsd": str(XSD),
+}
+
+def _nt_term(term) -> str:
+    """N-Triples form of a term. Literals are always written on one line with escapes (n3() may use long quotes)."""
+    if not isinstance(term, Literal):
+        return term.n3()
+    lexical = str(term).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    if term.language:
+        return f'"{lexical}"@{term.language}'
+    if term.datatype:
+        return f'"{lexical}"^^<{term.datatype}>'
+    return f'"{lexical}"'
+
+def _nt_line(triple: Tuple) -> str:
+    return f"{_nt_term(triple[0])} {_nt_term(triple[1])} {_nt_term(triple[2])} .\n"
+
+# Entity neighborhoods (get_entity_details): hops to follow and edges kept per node and direction
+ENTITY_DETAIL_DEPTH = 1
+ENTITY_DETAIL_FANOUT = 25
+# Triples read per entity and direction before its edge list is cut off (e.g. the
+# rdf:type edges into a large class, which are skipped, but would all be read)
+ENTITY_DETAIL_SCAN_LIMIT = 2000
+# Shown as an entity's description rather than as an edge
+DESCRIPTION_PREDICATES = (RDFS.comment, SKOS.definition)
+
+# validate_sparql_query: LIMIT added to unbounded queries, and namespaces whose terms are
+# built in (an unused rdfs:label is only a warning, an unused ex:hasFoo is an error).
+# Terms in these namespaces are also left out of the concept ranking.
+DEFAULT_QUERY_LIMIT = 1000
+QUERY_WAIT_INTERVAL = 0.05 # Seconds between on_query_wait calls for in-process queries
+BUILTIN_NAMESPACES = (str(RDF), str(RDFS), str(OWL), str(XSD))
+
+# match_terms: unmatched terms whose closest label scores at least this (trigram cosine)
+# are 'ambiguous' (worth an LLM look); below it they are 'unknown'
+AMBIGUOUS_MATCH_SCORE = 0.35
+
+# --- Shared ontologies ---
+# Process-wide registry of loaded ontologies, keyed by source identity. Sessions using
+# shared=True hold read-only handles on the registered graph and indexes; an entry is
+# dropped once no session references it.
+_SHARED_LOCK = threading.Lock()
+_SHARED_ONTOLOGIES: "weakref.WeakValueDictionary[tuple, OntologyProcessor]" = weakref.WeakValueDictionary()
+_SHARED_LOADING_LOCKS: Dict[tuple, threading.Lock] = {}
+
+def _acquire_shared_ontology(key: tuple, load: Callable[[], Optional["OntologyProcessor"]]) -> Optional["OntologyProcessor"]:
+    """Returns the registered ontology for key, loading it (once, even under concurrent callers) if needed."""
+    with _SHARED_LOCK:
+        base = _SHARED_ONTOLOGIES.get(key)
+        if base is not None:
+            return base
+        key_lock = _SHARED_LOADING_LOCKS.setdefault(key, threading.Lock())
+    with key_lock:
+        with _SHARED_LOCK:
+            base = _SHARED_ONTOLOGIES.get(key)
+        if base is None:
+            base = load()
+            if base is not None:
+                with _SHARED_LOCK:
+                    _SHARED_ONTOLOGIES[key] = base
+    return base
+
 
 class OntologyProcessor:
-    def __init__(self):
+    # State a shared-mode session takes from the registered ontology
+    SHARED_STATE = ("graph", "namespaces", "classification", "labels", "hierarchy", "text_index", "ngram_index", "term_matcher", "concept_ranking", "_store_path")
+    # Indexes a session copies before its first edit of a shared ontology
+    COPY_ON_WRITE_INDEXES = ("classification", "labels", "hierarchy", "text_index", "ngram_index", "term_matcher")
+    # Indexes stored in snapshots, so a snapshot hit does not rebuild them from the graph
+    PERSISTED_INDEXES = {"classification": ClassificationIndex, "labels": LabelIndex, "hierarchy": ClassHierarchy}
+    # Search indexes built on first use (None until then)
+    LAZY_INDEXES = {"text_index": TextIndex, "ngram_index": NgramIndex, "term_matcher": TermMatcher}
+
+    def __init__(self, snapshot_dir: Optional[str] = DEFAULT_SNAPSHOT_DIR, query_cache_bytes: int = 64 * 1024 * 1024,
+                 storage: str = "memory", store_dir: str = DEFAULT_STORE_DIR, parse_workers: Optional[int] = None,
+                 shared: bool = False, journal_dir: Optional[str] = None, embedder: Optional[Embedder] = None,
+                 journal_name: str = "default"):
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend '{storage}', expected one of {STORAGE_BACKENDS}")
         self.graph = Graph()
         self.namespaces = {} # To store namespaces for cleaner output
+        self.snapshot_dir = snapshot_dir # None disables the snapshot cache
+        self.storage = storage
+        self.store_dir = store_dir
+        self._store_path: Optional[str] = None # SQLite file backing the graph (sqlite storage only)
+        self.parse_workers = parse_workers or os.cpu_count() or 1 # Processes for parallel N-Triples/N-Quads loading
+        self.shared = shared # Use the process-wide registry instead of a private copy of the ontology
+        self._shared_base: Optional["OntologyProcessor"] = None # Registered ontology this session reads from
+        self.graph_version = 0 # Bumped on every change so cached results keyed on it go stale
+        self.query_cache = QueryResultCache(max_bytes=query_cache_bytes)
+        self.prepared_queries = PreparedQueryCache(self._compile_query)
+        self.entity_cache = QueryResultCache(max_bytes=8 * 1024 * 1024, max_entries=512) # get_entity_details results
+        self.last_query_error: Optional[str] = None # Message for the most recent failed query
+        self.query_stats: Optional[QueryStatistics] = None # Cardinalities for join ordering, collected on first use
+        self.query_plans: deque = deque(maxlen=100) # Estimated vs actual cost of recent queries, newest last
+        self._worker_settings: Optional[Dict[str, Any]] = None # Set by enable_query_workers
+        # Worker pool over the loaded graph (the registered ontology's pool is shared by its sessions)
+        self._worker_pool: Optional[SparqlWorkerPool] = None
+        self._worker_pool_store = None # Store the pool's workers hold a copy of
+        self._worker_snapshot: Optional[str] = None # Temp snapshot written for the worker pool
+        self._worker_finalizer: Optional[weakref.finalize] = None # Closes the pool (at shutdown or garbage collection)
+        self._worker_lock = threading.Lock()
+        self._worker_delta: Optional[Tuple[int, Dict[str, Any]]] = None # (graph_version, encoded overlay delta)
+        self._session_token = uuid.uuid4().hex # Tells this session's deltas apart in shared workers
+        self._query_cancel = threading.Event() # Set by cancel_running_queries; replaced per query
+        # Called with the elapsed seconds while a query runs; raising from it cancels the query
+        self.on_query_wait: Optional[Callable[[float], None]] = None
+        self._snapshot_file: Optional[Tuple[str, int]] = None # (path, graph_version) of the load snapshot
+        self.classification = ClassificationIndex()
+        self.labels = LabelIndex()
+        self.hierarchy = ClassHierarchy()
+        self.text_index: Optional[TextIndex] = None
+        self.ngram_index: Optional[NgramIndex] = None
+        self.term_matcher: Optional[TermMatcher] = None
+        self.concept_ranking: Optional[ConceptRanking] = None # Built on first use after a load or edit
+        self._columnar: Optional[Tuple[int, ColumnarGraph]] = None # (graph_version, view), built on demand
+        self.embedder = embedder or hashing_embedder # texts -> (n, dim) array; see concept_embeddings
+        self.concept_embeddings: Optional[ConceptEmbeddings] = None # Built (or memory-mapped) on first use
+        self.materializer: Optional[Materializer] = None # Set by enable_reasoning; queries then see inferred triples
+        self._loaded_source: Optional[Tuple[str, str, Optional[Tuple[int, int]]]] = None # (path, format, file stamp)
+        self.added_since_load: Dict[Tuple, None] = {} # Triples added through add_triple(s), in order
+        self.journal_dir = journal_dir # Edit journals are kept here (e.g. DEFAULT_JOURNAL_DIR); None disables them
+        self.journal_name = journal_name # Whose edits these are; sessions editing the same ontology at once need different names
+        self.journal: Optional[ChangeJournal] = None
+        self._uri_cache: Dict[str, URIRef] = {}
 
-    def load_ontology(self, file_path: str, file_format: str = "turtle") -> bool:
-        """Loads an ontology from a file."""
+    def load_ontology(self, file_path: str, file_format: str = "turtle",
+                      progress_callback: Optional[Callable[[float, str], None]] = None) -> bool:
+        """
+        Loads an ontology from a file, using a pre-parsed snapshot or on-disk store when one is available.
+        progress_callback(fraction, message) is called as loading proceeds (e.g. st.progress(...).progress).
+        """
+        progress = progress_callback or (lambda fraction, message: None)
         try:
-            self.graph = Graph() # Reset graph
-            self.graph.parse(file_path, format=file_format)
-            self.namespaces = dict(self.graph.namespaces())
-            print(f"Ontology loaded successfully from {file_path}. Found {len(self.graph)} triples.")
+            self._detach_shared()
+            self._close_journal()
+            self._loaded_source = (file_path, file_format, _file_stamp(file_path))
+            self._snapshot_file = None
+            self.added_since_load = {}
+            if self.journal_dir:
+                self._open_journal(file_path, file_format)
+            journal_snapshot = self.journal.snapshot_path if self.journal is not None else None
+            from_source = self.shared or self.storage == "sqlite" # Sessions that read the unedited source
+            if journal_snapshot and not from_source and self._load_snapshot(journal_snapshot):
+                # Source plus compacted edits; only the journal tail is left to replay
+                print(f"Ontology loaded from edit snapshot for {file_path}. Found {len(self.graph)} triples.")
+                progress(1.0, "Loaded from edit snapshot")
+                journal_snapshot = None
+            else:
+                self._load_source(file_path, file_format, progress)
+            if self.journal is not None:
+                # Shared and on-disk sessions read the unedited source, so the edit snapshot is applied as a delta
+                self._replay_journal(journal_snapshot if from_source else None)
             return True
         except Exception as e:
             print(f"Error loading ontology: {e}")
-            self.graph = Graph() # Ensure graph is empty on failure
+            self._set_graph(Graph()) # Ensure graph is empty on failure
+            self.namespaces = {}
+            self._loaded_source = None
+            self._close_journal()
+            self._rebuild_indexes()
+            return False
+
+    def _load_source(self, file_path: str, file_format: str, progress: Callable[[float, str], None]):
+        """Loads the source file through the registry, an on-disk store, a snapshot or the parser."""
+        if self.shared and self._load_shared(file_path, file_format, progress):
+            return
+        if self.storage == "sqlite":
+            self._load_into_store(file_path, file_format, progress)
+            return
+
+        snapshot_path = self._snapshot_path(file_path, file_format)
+        if snapshot_path and self._load_snapshot(snapshot_path):
+            self._snapshot_file = (snapshot_path, self.graph_version)
+            print(f"Ontology loaded from snapshot for {file_path}. Found {len(self.graph)} triples.")
+            progress(1.0, "Loaded from snapshot")
+            return
+
+        self._set_graph(Graph()) # Reset graph
+        self._parse_file(self.graph, file_path, file_format, progress)
+        self.namespaces = dict(self.graph.namespaces())
+        self._rebuild_indexes()
+        print(f"Ontology loaded successfully from {file_path}. Found {len(self.graph)} triples.")
+        if snapshot_path and self._write_snapshot(snapshot_path):
+            self._snapshot_file = (snapshot_path, self.graph_version)
+
+    def reload_ontology(self, file_path: Optional[str] = None, file_format: Optional[str] = None,
+                        progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """
+        Re-reads the loaded ontology file (or file_path) and applies only the differences
+        to the current graph, instead of replacing it. Indexes are updated for the added
+        triples and rebuilt only when a removed triple affects them; the graph then
+        matches the file again (edits made since the last load are dropped).
+
+        Returns {"success": bool, "added": int, "removed": int}.
+        """
+        if self._loaded_source is None and file_path is None:
+            print("Cannot reload, no ontology loaded.")
+            return {"success": False, "added": 0, "removed": 0}
+        loaded_path, loaded_format, loaded_stamp = self._loaded_source or (None, None, None)
+        file_path = file_path or loaded_path
+        file_format = file_format or loaded_format or "turtle"
+        progress = progress_callback or (lambda fraction, message: None)
+        stamp = _file_stamp(file_path)
+        if (file_path, file_format) == (loaded_path, loaded_format) and stamp is not None and stamp == loaded_stamp:
+            progress(1.0, "Unchanged")
+            return {"success": True, "added": 0, "removed": 0}
+        if self.storage == "sqlite" or self._loaded_source is None:
+            # On-disk stores are keyed by source content, so a changed file gets its own store
+            success = self.load_ontology(file_path, file_format, progress_callback)
+            return {"success": success, "added": len(self.graph) if success else 0, "removed": 0}
+        try:
+            new_graph = Graph()
+            self._parse_file(new_graph, file_path, file_format, progress)
+            added, removed = self._diff_graph(new_graph)
+            self._apply_delta(added, removed)
+            namespaces = dict(new_graph.namespaces())
+            if namespaces != self.namespaces:
+                for prefix, ns in namespaces.items():
+                    self.graph.bind(prefix, ns, override=True, replace=True)
+                self.namespaces = namespaces
+                self.prepared_queries.clear()
+            self._loaded_source = (file_path, file_format, stamp)
+            self.added_since_load = {} # The graph matches the file again
+            if self.journal_dir:
+                self._close_journal()
+                self._open_journal(file_path, file_format) # Edits journaled against the new file version
+            progress(1.0, "Reloaded")
+            print(f"Ontology reloaded from {file_path}: {len(added)} triples added, {len(removed)} removed.")
+            return {"success": True, "added": len(added), "removed": len(removed)}
+        except Exception as e:
+            print(f"Error reloading ontology: {e}")
+            return {"success": False, "added": 0, "removed": 0}
+
+    def _diff_graph(self, new_graph: Graph) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        (added, removed) triples between the current graph and new_graph. Blank nodes get
+        new ids on every parse, so triples containing them are compared per component, up
+        to isomorphism, and a component is replaced only if it changed.
+        """
+        def _has_bnode(triple) -> bool:
+            return any(isinstance(term, BNode) for term in triple)
+
+        added, removed, old_bnodes, new_bnodes = [], [], [], []
+        for triple in new_graph:
+            if _has_bnode(triple):
+                new_bnodes.append(triple)
+            elif triple not in self.graph:
+                added.append(triple)
+        for triple in self.graph:
+            if _has_bnode(triple):
+                old_bnodes.append(triple)
+            elif triple not in new_graph:
+                removed.append(triple)
+        old_components: Dict[str, List[List[Tuple]]] = {}
+        for component in _bnode_components(old_bnodes):
+            old_components.setdefault(_component_signature(component), []).append(component)
+        for component in _bnode_components(new_bnodes):
+            unchanged = old_components.get(_component_signature(component))
+            if unchanged:
+                unchanged.pop()
+            else:
+                added.extend(component)
+        for components in old_components.values():
+            for component in components:
+                removed.extend(component)
+        return added, removed
+
+    def _apply_delta(self, added: List[Tuple], removed: List[Tuple]):
+        """Applies a diff to the graph, updating indexes incrementally where the removals allow it."""
+        if not added and not removed:
+            return
+        self._ensure_writable()
+        for triple in removed:
+            self.graph.remove(triple)
+            self.added_since_load.pop(triple, None)
+        self.graph.addN((s, p, o, self.graph) for s, p, o in added)
+        self.added_since_load.update(dict.fromkeys(added))
+        if not removed:
+            self._index_triples(added)
+            return
+        self.graph_version += 1
+        self.concept_ranking = None
+        self.concept_embeddings = None
+        removed_predicates = {p for _, p, _ in removed}
+        for name in self.COPY_ON_WRITE_INDEXES:
+            index = getattr(self, name)
+            if index is None:
+                continue # Not built yet; it will be built from the updated graph
+            if removed_predicates.intersection(index.PREDICATES):
+                if not hasattr(index, "remove"): # Rebuilt from the updated graph
+                    setattr(self, name, type(index).build(self.graph))
+                    continue
+                for triple in removed:
+                    index.remove(*triple)
+            for triple in added:
+                index.add(*triple)
+        self._refresh_materializer() # Retracting inferences needs the full closure again
+
+    def _load_into_store(self, file_path: str, file_format: str, progress: Callable[[float, str], None]) -> bool:
+        """
+        Opens the SQLite store for a source file, building it first if needed. The store
+        is built under a temporary name and renamed when complete, so a store file that
+        exists is always fully loaded.
+        """
+        key = self._source_key(file_path, file_format)
+        if key is None:
+            raise ValueError("SQLite storage requires an ontology file on disk.")
+        store_path = os.path.join(self.store_dir, f"{key}.sqlite")
+        if os.path.exists(store_path):
+            self._set_graph(open_sqlite_graph(store_path, read_only=True), store_path)
+            how = "from on-disk store"
+        else:
+            tmp_path = f"{store_path}.{os.getpid()}.tmp"
+            graph = open_sqlite_graph(tmp_path)
+            try:
+                self._parse_file(graph, file_path, file_format, progress)
+                graph.commit()
+            finally:
+                graph.close()
+            os.replace(tmp_path, store_path)
+            self._set_graph(open_sqlite_graph(store_path, read_only=True), store_path)
+            how = "into new on-disk store"
+        progress(1.0, "Loaded")
+        self.namespaces = dict(self.graph.namespaces())
+        self._rebuild_indexes()
+        print(f"Ontology loaded {how} for {file_path}. Found {len(self.graph)} triples.")
+        return True
+
+    def _load_shared(self, file_path: str, file_format: str, progress: Callable[[float, str], None]) -> bool:
+        """Attaches to the registered copy of a source file, loading it into the registry first if needed."""
+        key = self._source_key(file_path, file_format)
+        if key is None:
+            return False # Not a file on disk; load a private copy instead
+        registry_key = (key, self.storage, self.store_dir if self.storage == "sqlite" else None)
+
+        def _load_base() -> Optional[OntologyProcessor]:
+            base = OntologyProcessor(snapshot_dir=self.snapshot_dir, storage=self.storage,
+                                     store_dir=self.store_dir, parse_workers=self.parse_workers)
+            return base if base.load_ontology(file_path, file_format, progress) else None
+
+        base = _acquire_shared_ontology(registry_key, _load_base)
+        if base is None:
+            raise RuntimeError(f"Could not load shared ontology from {file_path}")
+        self._set_graph(Graph())
+        for name in self.SHARED_STATE:
+            setattr(self, name, getattr(base, name))
+        self.namespaces = dict(base.namespaces)
+        self._shared_base = base
+        self._invalidate_caches()
+        self._refresh_materializer()
+        if base._snapshot_file:
+            self._snapshot_file = (base._snapshot_file[0], self.graph_version)
+        progress(1.0, "Attached to shared ontology")
+        print(f"Using shared ontology for {file_path} ({len(self.graph)} triples).")
+        return True
+
+    def _detach_shared(self):
+        """Drops this session's handle on a registered ontology (without touching the shared graph)."""
+        if self._shared_base is not None:
+            self.graph = Graph()
+            self._shared_base = None
+
+    def _ensure_writable(self):
+        """
+        Copy-on-write: before the first edit, switch to an overlay graph over the loaded
+        one, so the loaded graph (a shared ontology, an on-disk store, or what query
+        workers hold) never changes and the edits stay private to this session. The
+        mutable indexes of a shared ontology are copied too; a copy shares its inner
+        containers (postings, edge lists) with the shared index until it modifies them.
+        """
+        if isinstance(self.graph.store, OverlayStore):
+            return
+        shared = self._shared_base is not None and self.graph is self._shared_base.graph
+        # Same identifier, so Graph(store=<loaded store>, identifier=...) still reads the loaded triples
+        self.graph = Graph(store=OverlayStore(self.graph.store), identifier=self.graph.identifier)
+        if shared:
+            for name in self.COPY_ON_WRITE_INDEXES:
+                index = getattr(self, name)
+                if index is not None:
+                    setattr(self, name, index.copy())
+        if self.materializer is not None:
+            self.materializer.rebase(self.graph)
+
+    def _parse_file(self, graph: Graph, file_path: str, file_format: str, progress: Callable[[float, str], None]):
+        """Parses a file into graph, in parallel chunks for large N-Triples/N-Quads files."""
+        rdf_format = LINE_FORMATS.get(file_format)
+        if (rdf_format is None or self.parse_workers < 2 or not isinstance(file_path, str)
+                or not os.path.isfile(file_path) or os.path.getsize(file_path) < PARALLEL_PARSE_MIN_BYTES):
+            progress(0.0, "Parsing...")
+            graph.parse(file_path, format=file_format)
+            progress(1.0, "Parsed")
+            return
+
+        chunks = _split_line_chunks(file_path, PARALLEL_CHUNK_BYTES)
+        bnode_prefix = uuid.uuid4().hex[:12] # Keeps blank node labels distinct from other loads
+        total = sum(end - start for start, end in chunks)
+        done = 0
+        interned: Dict[tuple, Any] = {} # Terms repeated across chunks are decoded once
+        progress(0.0, f"Parsing {len(chunks)} chunks on {self.parse_workers} processes...")
+        # Spawned workers: forking a threaded server process is unsafe
+        with ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_parse_line_chunk, file_path, start, end, rdf_format, bnode_prefix): end - start
+                       for start, end in chunks}
+            for future in as_completed(futures):
+                terms, id_bytes = future.result() # Re-raises parse errors from the worker
+                if isinstance(graph.store, SQLiteStore):
+                    graph.store.add_encoded(terms, id_bytes) # Loaded in SQL, no rdflib terms built
+                else:
+                    # Parsed terms are valid nodes; skip Graph.addN's per-triple checks
+                    graph.store.addN((s, p, o, graph) for s, p, o in _decode_triples(terms, id_bytes, interned))
+                done += futures[future]
+                progress(done / total, f"Parsed {done / total:.0%} of {os.path.basename(file_path)}")
+
+    def _set_graph(self, graph: Graph, store_path: Optional[str] = None):
+        """Replaces the working graph, releasing the previous one's store (never a shared one)."""
+        shared_store = self._shared_base.graph.store if self._shared_base is not None else None
+        if self.graph is not graph:
+            store = self.graph.store
+            if isinstance(store, OverlayStore):
+                store = store.base # Edited session: release the store the overlay reads from
+            if store is not shared_store:
+                store.close()
+                self._shutdown_worker_pool() # Its workers hold the graph being released
+        self.graph = graph
+        self._store_path = store_path
+
+    def _invalidate_caches(self):
+        """Marks the graph as replaced: bumps the version and drops cached queries and results."""
+        self.graph_version += 1
+        self.query_cache.clear()
+        self.prepared_queries.clear() # Compiled queries capture the graph's prefixes
+        self.entity_cache.clear()
+
+    def _rebuild_indexes(self, persisted: Optional[Dict[str, Any]] = None):
+        """
+        Rebuilds the derived indexes for the current graph. persisted holds indexes read
+        from a snapshot of that graph, used instead of rebuilding them; search indexes
+        and other derived data are dropped and built again on first use.
+        """
+        self._invalidate_caches()
+        for name, index_class in self.PERSISTED_INDEXES.items():
+            index = (persisted or {}).get(name)
+            setattr(self, name, index if isinstance(index, index_class) else index_class.build(self.graph))
+        for name in self.LAZY_INDEXES:
+            setattr(self, name, None)
+        self.concept_ranking = None # Ranked on first use (get_key_concepts_sample)
+        self.concept_embeddings = None
+        self.query_stats = None
+        self._refresh_materializer()
+
+    def _lazy_index(self, name: str):
+        """A search index (see LAZY_INDEXES), built from the current graph on first use."""
+        index = getattr(self, name)
+        if index is None:
+            if self._shared_base is not None and self.graph is self._shared_base.graph:
+                index = self._shared_base._lazy_index(name) # Unmodified shared ontology: share its index
+            else:
+                index = self.LAZY_INDEXES[name].build(self.graph)
+            setattr(self, name, index)
+        return index
+
+    def _refresh_materializer(self):
+        """Recomputes the inferred triples for a newly loaded graph (when reasoning is enabled)."""
+        if self.materializer is not None:
+            self.materializer = Materializer(self.graph)
+            self.materializer.materialize()
+
+    def _index_triples(self, triples: List[Tuple]):
+        """Updates derived indexes for newly added triples. Caches are invalidated once per call."""
+        if not triples:
+            return
+        self.graph_version += 1
+        for triple in triples:
+            self.classification.add(*triple)
+            self.labels.add(*triple)
+            self.hierarchy.add(*triple)
+            if self.text_index is not None:
+                self.text_index.add(*triple)
+            if self.ngram_index is not None:
+                self.ngram_index.add(*triple)
+            if self.term_matcher is not None:
+                self.term_matcher.add(*triple)
+        self.concept_ranking = None
+        self.concept_embeddings = None
+        if self.materializer is not None:
+            self.materializer.add(triples)
+
+    def _source_key(self, file_path: str, file_format: str) -> Optional[str]:
+        """Cache key for a source file: its content hash, the rdflib version and format."""
+        if not isinstance(file_path, str) or not os.path.isfile(file_path):
+            return None # Only plain files on disk can be content-hashed
+        return hashlib.sha256(
+            f"{_file_sha256(file_path)}|{rdflib.__version__}|{file_format}|{SNAPSHOT_VERSION}".encode()
+        ).hexdigest()
+
+    def _snapshot_path(self, file_path: str, file_format: str) -> Optional[str]:
+        """Returns the snapshot location for a source file."""
+        key = self._source_key(file_path, file_format) if self.snapshot_dir else None
+        return os.path.join(self.snapshot_dir, f"{key}.snap") if key else None
+
+    def _load_snapshot(self, snapshot_path: str, indexes: bool = True) -> bool:
+        """
+        Rebuilds the graph and namespaces from a snapshot, and with indexes its derived
+        indexes (the persisted ones are read back, not rebuilt). Invalid snapshots are removed.
+        """
+        if not os.path.exists(snapshot_path):
+            return False
+        try:
+            graph, persisted = self._read_snapshot_data(snapshot_path)
+            self._set_graph(graph)
+            self.namespaces = dict(graph.namespaces())
+        except Exception as e:
+            print(f"Discarding unusable ontology snapshot {snapshot_path}: {e}")
+            try:
+                os.remove(snapshot_path)
+            except OSError:
+                pass
+            return False
+        if indexes:
+            self._rebuild_indexes(persisted)
+        return True
+
+    @staticmethod
+    def _read_snapshot(snapshot_path: str) -> Graph:
+        """Builds an in-memory graph from a snapshot file. Raises ValueError if it is corrupt."""
+        return OntologyProcessor._read_snapshot_data(snapshot_path)[0]
+
+    @staticmethod
+    def _read_snapshot_data(snapshot_path: str) -> Tuple[Graph, Dict[str, Any]]:
+        """(graph, persisted indexes by name) from a snapshot file. Raises ValueError if it is corrupt."""
+        with open(snapshot_path, "rb") as f:
+            header = f.read(len(SNAPSHOT_MAGIC) + 32)
+            payload = f.read()
+        if header[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or header[len(SNAPSHOT_MAGIC):] != hashlib.sha256(payload).digest():
+            raise ValueError("checksum mismatch")
+        data = pickle.loads(payload)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {data.get('version')}")
+        triples = _decode_triples(data["terms"], data["triples"])
+        graph = Graph()
+        for prefix, ns in data["namespaces"]:
+            graph.bind(prefix, URIRef(ns), override=True, replace=True)
+        graph.addN((s, p, o, graph) for s, p, o in triples)
+        return graph, data.get("indexes") or {}
+
+    def _write_snapshot(self, snapshot_path: str, graph: Optional[Graph] = None) -> bool:
+        """
+        Writes the current graph (or `graph`) as a snapshot, with the persisted indexes when
+        it is the current graph. Failures are reported but never fatal.
+        """
+        own_graph = graph is None or graph is self.graph
+        graph = graph if graph is not None else self.graph
+        try:
+            terms, id_bytes = _encode_triples(graph)
+            payload = pickle.dumps({
+                "version": SNAPSHOT_VERSION,
+                "terms": terms,
+                "triples": id_bytes,
+                "namespaces": [(prefix, str(ns)) for prefix, ns in self.graph.namespaces()],
+                "indexes": {name: getattr(self, name) for name in self.PERSISTED_INDEXES} if own_graph else {},
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + hashlib.sha256(payload).digest())
+                f.write(payload)
+            os.replace(tmp_path, snapshot_path) # Atomic, so readers never see a partial file
+            return True
+        except Exception as e:
+            print(f"Error writing ontology snapshot: {e}")
             return False
 
     def get_summary(self) -> Dict[str, int]:
@@ -27,91 +844,986 @@ class OntologyProcessor:
             return {"triples": 0, "classes": 0, "individuals": 0, "properties": 0}
 
         # Note: These counts can be approximations depending on ontology style (e.g. implicit classes)
-        classes = set(self.graph.subjects(RDF.type, OWL.Class))
-        individuals = set(self.graph.subjects(RDF.type, OWL.NamedIndividual))
-        # More robust way to find individuals (anything with a type that isn't a Class/Property/Ontology)
-        all_types = set(self.graph.objects(None, RDF.type))
-        non_individual_types = {OWL.Class, RDFS.Class, OWL.ObjectProperty, OWL.DatatypeProperty, OWL.AnnotationProperty, OWL.Ontology, RDF.Property}
-        potential_individual_types = all_types - non_individual_types
-        individuals.update(s for s, o in self.graph.subject_objects(RDF.type) if o in potential_individual_types)
-
-        obj_properties = set(self.graph.subjects(RDF.type, OWL.ObjectProperty))
-        dt_properties = set(self.graph.subjects(RDF.type, OWL.DatatypeProperty))
-        properties = obj_properties.union(dt_properties)
-
-        return {
-            "triples": len(self.graph),
-            "classes": len(classes),
-            "individuals": len(individuals),
-            "properties": len(properties)
-        }
+        summary = self.classification.counts()
+        return {"triples": len(self.graph), **summary}
 
     def get_classes(self) -> List[str]:
         """Returns a list of class URIs."""
         if not self.graph: return []
-        return [str(cls) for cls in self.graph.subjects(RDF.type, OWL.Class)]
+        return list(self.classification.classes)
+
+    def _build_concept_ranking(self) -> ConceptRanking:
+        def _rankable(uri: str) -> bool:
+            # Indexes hold blank nodes (restrictions, unions) by their id, which has no scheme
+            return ":" in uri and not uri.startswith(BUILTIN_NAMESPACES)
+        classes = [uri for uri in itertools.chain(self.classification.classes, self.hierarchy)
+                   if _rankable(uri) and uri not in self.classification.properties]
+        properties = [uri for uri in self.classification.properties if _rankable(uri)]
+        return ConceptRanking.build(self.graph, classes, properties)
+
+    def _get_concept_ranking(self) -> ConceptRanking:
+        """The ranking of the current graph, computed on first use after a load or edit."""
+        if self.concept_ranking is None:
+            if self._shared_base is not None and self.graph is self._shared_base.graph:
+                self.concept_ranking = self._shared_base._get_concept_ranking() # Unmodified shared ontology
+            else:
+                self.concept_ranking = self._build_concept_ranking()
+        return self.concept_ranking
+
+    def get_key_concepts_sample(self, sample_size: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns the sample_size most important classes and properties, ranked once per load
+        (on the first call) by PageRank over the class/property graph, degree and instance count.
+        Entries are {"uri", "label", "score", "degree"[, "instances"]}.
+        """
+        if not self.graph: return {"classes": [], "properties": []}
+        ranking = self._get_concept_ranking()
+        return {
+            kind: [{**entry, "label": self.labels.preferred_label(entry["uri"]) or uri_fragment(entry["uri"])}
+                   for entry in entries[:sample_size]]
+            for kind, entries in (("classes", ranking.classes), ("properties", ranking.properties))
+        }
 
     def get_individuals(self) -> List[str]:
          """Returns a list of individual URIs."""
          if not self.graph: return []
-         # More robust way needed here as well
-         individuals = set(self.graph.subjects(RDF.type, OWL.NamedIndividual))
-         all_types = set(self.graph.objects(None, RDF.type))
-         non_individual_types = {OWL.Class, RDFS.Class, OWL.ObjectProperty, OWL.DatatypeProperty, OWL.AnnotationProperty, OWL.Ontology, RDF.Property}
-         potential_individual_types = all_types - non_individual_types
-         individuals.update(s for s, o in self.graph.subject_objects(RDF.type) if o in potential_individual_types and isinstance(s, URIRef))
+         return list(self.classification.individuals)
+
+    def get_properties(self) -> List[str]:
+        """Returns a list of object and datatype property URIs."""
+        if not self.graph: return []
+        return list(self.classification.properties)
+
+    def get_superclasses(self, class_uri: str, include_self: bool = False) -> List[str]:
+        """Returns all (transitive) superclasses of a class."""
+        return self.hierarchy.ancestors(class_uri, include_self)
+
+    def get_subclasses(self, class_uri: str, include_self: bool = False) -> List[str]:
+        """Returns all (transitive) subclasses of a class."""
+        return self.hierarchy.descendants(class_uri, include_self)
+
+    def is_subclass_of(self, sub_uri: str, super_uri: str) -> bool:
+        return self.hierarchy.is_subclass_of(sub_uri, super_uri)
+
+    def is_instance_of(self, entity_uri: str, class_uri: str) -> bool:
+        """True if the entity is typed with the class or any of its subclasses."""
+        return self.hierarchy.is_instance_of(entity_uri, class_uri)
+
+    def get_instances(self, class_uri: str, include_subclasses: bool = True) -> List[str]:
+        return self.hierarchy.instances(class_uri, include_subclasses)
+
+    def get_least_common_ancestors(self, uri_a: str, uri_b: str) -> List[str]:
+        return self.hierarchy.least_common_ancestors(uri_a, uri_b)
+
+    def enable_reasoning(self) -> int:
+        """
+        Materializes RDFS/OWL-RL consequences (inherited types, domain/range, inverse,
+        symmetric and transitive properties) so SPARQL queries see inferred facts.
+        Inferred triples are kept apart from the asserted graph and extended
+        incrementally as triples are added. Returns the number of inferred triples.
+        """
+        self.materializer = Materializer(self.graph)
+        inferred = self.materializer.materialize()
+        self._invalidate_caches()
+        print(f"Reasoning enabled: {inferred} inferred triples.")
+        return inferred
+
+    def disable_reasoning(self):
+        """Drops the inferred triples; queries see only asserted triples again."""
+        if self.materializer is not None:
+            self.materializer = None
+            self._invalidate_caches()
+
+    def get_inferred_triples(self) -> List[Tuple[str, str, Any]]:
+        """Returns the inferred (not asserted) triples, converted like query results."""
+        if self.materializer is None: return []
+        return [tuple(self._convert_term(term) for term in triple) for triple in self.materializer.inferred]
+
+    def _query_graph(self) -> Graph:
+        """The graph SPARQL runs against: asserted triples, plus inferred ones when reasoning is enabled."""
+        return self.materializer.graph if self.materializer is not None else self.graph
+
+    def get_columnar_view(self) -> Optional[ColumnarGraph]:
+        """
+        Returns a read-only, array-backed copy of the graph for vectorized statistics.
+        Built on first use and rebuilt after the graph changes.
+        """
+        if not self.graph: return None
+        if self._shared_base is not None and self.graph is self._shared_base.graph:
+            return self._shared_base.get_columnar_view() # Unmodified shared ontology: share its view too
+        if self._columnar is None or self._columnar[0] != self.graph_version:
+            self._columnar = (self.graph_version, ColumnarGraph.build(self.graph))
+        return self._columnar[1]
+
+    def get_graph_statistics(self) -> Dict[str, Any]:
+        """Triple, predicate, per-class instance and degree statistics computed on the columnar view."""
+        view = self.get_columnar_view()
+        if view is None:
+            return {"triples": 0}
+        return {
+            "triples": len(view),
+            **view.distinct_counts(),
+            "predicate_counts": view.predicate_counts(),
+            "instance_counts": view.instance_counts(),
+            "out_degree": view.degree_distribution("out"),
+            "in_degree": view.degree_distribution("in"),
+        }
+
+    def _get_query_statistics(self) -> Optional[QueryStatistics]:
+        """
+        Cardinalities for join ordering, collected on the first planned query after a load:
+        by SQL aggregates for an on-disk store, from the columnar view if one is already
+        built, else by scanning the graph once per predicate.
+        """
+        if self._shared_base is not None:
+            return self._shared_base._get_query_statistics() # Close enough after this session's few edits
+        if self.query_stats is None and self.graph:
+            store = self.graph.store
+            if isinstance(store, OverlayStore):
+                store = store.base # Close enough after this session's few edits
+            if isinstance(store, SQLiteStore):
+                self.query_stats = QueryStatistics(self.graph, **store.cardinalities())
+            elif self._columnar is not None and self._columnar[0] == self.graph_version:
+                self.query_stats = QueryStatistics.from_columnar(self._columnar[1], self.graph)
+            else:
+                self.query_stats = QueryStatistics.from_graph(self.graph)
+        return self.query_stats
+
+    def _compile_query(self, query: str):
+        # Same prefixes Graph.query would use for a raw string
+        compiled = prepareQuery(query, initNs=dict(self.graph.namespaces()))
+        # Join order by estimated cardinality rather than as written. The statistics are
+        # collected once per load; edits since then only make the estimates less accurate.
+        stats = self._get_query_statistics()
+        compiled.plan = reorder_query(compiled.algebra, stats) if stats is not None else None
+        return compiled
+
+    def prepare_query(self, query: str):
+        """Returns the compiled form of a query from the prepared-query cache (compiling it on first use)."""
+        return self.prepared_queries.get(query)
+
+    def validate_sparql_query(self, query: str, default_limit: Optional[int] = DEFAULT_QUERY_LIMIT,
+                              reject_cartesian: bool = True) -> Dict[str, Any]:
+        """
+        Static checks for a generated query, without evaluating it: it must parse (which
+        also catches unknown prefixes), the predicates and classes it names must occur in
+        the ontology, and its triple patterns must not form a cross product (an error, or a
+        warning when reject_cartesian is False). A query without a LIMIT gets default_limit.
+        Returns {"valid", "query" (possibly rewritten), "errors", "warnings"}.
+        """
+        report: Dict[str, Any] = {"valid": False, "query": query, "errors": [], "warnings": []}
+        if not self.graph:
+            report["errors"].append("No ontology loaded.")
+            return report
+        try:
+            compiled = self.prepared_queries.get(query)
+        except Exception as e:
+            report["errors"].append(f"Query does not parse: {e}")
+            return report
+
+        graph = self._query_graph()
+        for role, iri in pattern_iris(compiled.algebra):
+            if role == "predicate":
+                known = (None, iri, None) in graph
+            elif role == "class":
+                known = (None, RDF.type, iri) in graph or (iri, None, None) in graph
+            else:
+                known = (iri, None, None) in graph or (None, None, iri) in graph or (None, iri, None) in graph
+            if known:
+                continue
+            message = f"Unknown {role} {iri.n3()}: it does not occur in the ontology"
+            if role == "resource" or str(iri).startswith(BUILTIN_NAMESPACES):
+                report["warnings"].append(message)
+            else:
+                report["errors"].append(message)
+
+        for groups in cartesian_products(compiled.algebra):
+            message = "Patterns share no variables and would be joined as a cross product: " + " | ".join(groups)
+            (report["errors"] if reject_cartesian else report["warnings"]).append(message)
+
+        if report["errors"]:
+            return report
+        if default_limit is not None and compiled.algebra.name != "AskQuery" and not has_limit(compiled.algebra):
+            bounded = f"{query.rstrip()}\nLIMIT {int(default_limit)}"
+            try:
+                self.prepared_queries.get(bounded)
+                report["query"] = bounded
+                report["warnings"].append(f"No LIMIT given; added LIMIT {int(default_limit)}.")
+            except Exception:
+                report["warnings"].append("No LIMIT given and one could not be added (e.g. after a VALUES clause).")
 
-         return [str(ind) for ind in individuals]
+        report["valid"] = True
+        return report
 
+    def run_sparql_query(self, query: str, bindings: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Executes a SPARQL query and returns results.
 
-    def run_sparql_query(self, query: str) -> Optional[List[Dict[str, Any]]]:
-        """Executes a SPARQL query and returns results."""
+        The query is compiled once and reused from the prepared-query cache; `bindings`
+        maps variable names to RDFLib terms (passed as initBindings), so templated
+        queries only differ in their bindings. Results are cached per (normalized
+        query, bindings, graph version); the returned list may be shared with the
+        cache and should not be modified.
+        """
         if not self.graph:
             print("Cannot query, no ontology loaded.")
             return None
+        normalized = normalize_query(query)
+        init_bindings = self._init_bindings(bindings)
+        cache_key = (normalized, tuple(sorted(init_bindings.items())), self.graph_version)
+        if use_cache:
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
-            results = self.graph.query(query)
-            output = []
-            for row in results:
-                row_dict = {}
-                # Use try-except for accessing potentially unbound variables
-                for var in results.vars:
-                   try:
-                       val = row[var]
-                       # Convert RDFLib terms to python types for easier display/JSON
-                       if isinstance(val, URIRef):
-                           row_dict[str(var)] = str(val)
-                       elif isinstance(val, Literal):
-                           row_dict[str(var)] = val.toPython()
-                       else: # Blank nodes etc.
-                           row_dict[str(var)] = str(val)
-                   except KeyError:
-                        row_dict[str(var)] = None # Variable was not bound in this row
-                output.append(row_dict)
+            output = self._fetch_rows(query, normalized, init_bindings)
+            if use_cache:
+                self.query_cache.put(cache_key, output)
             return output
+        except Exception as e:
+            print(f"Error executing SPARQL query: {e}")
+            self.last_query_error = str(e)
+            return None
+
+    def iter_sparql_query(self, query: str, bindings: Optional[Dict[str, Any]] = None, page_size: Optional[int] = None) -> Optional[Iterator]:
+        """
+        Executes a SPARQL query and streams its results instead of building a list.
+        Yields row dicts, or lists of up to page_size row dicts when page_size is given.
+        Returns None if the query cannot be compiled; evaluation errors end the stream.
+        """
+        if not self.graph:
+            print("Cannot query, no ontology loaded.")
+            return None
+        try:
+            results = self._execute_query(query, normalize_query(query), self._init_bindings(bindings))
         except Exception as e:
             print(f"Error executing SPARQL query: {e}")
             return None
+        rows = self._guarded_rows(results)
+        if page_size is None:
+            return rows
+        return iter(lambda: list(itertools.islice(rows, page_size)), [])
+
+    def get_sparql_page(self, query: str, page: int, page_size: int = 100, bindings: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns one page (0-based) of a query's results, streaming past earlier rows
+        rather than materializing them. Pages are kept in the result cache.
+        """
+        if not self.graph:
+            print("Cannot query, no ontology loaded.")
+            return None
+        init_bindings = self._init_bindings(bindings)
+        cache_key = (normalize_query(query), tuple(sorted(init_bindings.items())), self.graph_version, "page", page, page_size)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            output = self._fetch_rows(query, cache_key[0], init_bindings, offset=page * page_size, limit=page_size)
+        except Exception as e:
+            print(f"Error executing SPARQL query: {e}")
+            self.last_query_error = str(e)
+            return None
+        self.query_cache.put(cache_key, output)
+        return output
+
+    def run_sparql_query_columnar(self, query: str, bindings: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, List[Any]]]:
+        """
+        Executes a SPARQL query and returns {variable: [values...]}, one list per
+        variable, suitable for pd.DataFrame(...) without building per-row dicts.
+        """
+        if not self.graph:
+            print("Cannot query, no ontology loaded.")
+            return None
+        try:
+            results = self._execute_query(query, normalize_query(query), self._init_bindings(bindings))
+            variables = list(results.vars or [])
+            columns: Dict[str, List[Any]] = {str(var): [] for var in variables}
+            appenders = [(var, columns[str(var)].append) for var in variables]
+            for binding in self._iter_bindings(results):
+                for var, append in appenders:
+                    append(self._convert_term(binding.get(var)))
+            return columns
+        except Exception as e:
+            print(f"Error executing SPARQL query: {e}")
+            return None
+
+    def _fetch_rows(self, query: str, normalized: str, init_bindings: Dict[str, Any], offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Evaluates a query to converted rows, in a worker process when workers are enabled."""
+        self.last_query_error = None
+        started = time.perf_counter()
+        compiled = self.prepared_queries.get(query, key=normalized)
+        self._query_cancel = threading.Event()
+        pool = self._get_worker_pool()
+        if pool is not None:
+            settings = self._worker_settings
+            output = pool.run(query, init_bindings, offset=offset, limit=limit, timeout=settings["timeout"],
+                              max_rows=settings["max_rows"], cancel_event=self._query_cancel,
+                              on_wait=self.on_query_wait, delta=self._get_worker_delta(pool))
+        else:
+            rows = self._iter_rows(self._query_graph().query(compiled, initBindings=init_bindings))
+            rows = self._cancellable(rows, self._query_cancel)
+            output = list(itertools.islice(rows, offset, None if limit is None else offset + limit))
+        plan = compiled.plan
+        if plan is not None:
+            self.query_plans.append({"query": normalized, **plan, "actual_rows": len(output),
+                                     "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)})
+        return output
+
+    def _cancellable(self, rows: Iterator, cancel: threading.Event) -> Iterator:
+        """
+        In-process counterpart of the worker pool's cancellation: between rows, calls
+        on_query_wait (at most every QUERY_WAIT_INTERVAL seconds) and stops when the query
+        is cancelled. A query still searching for its next row cannot be interrupted.
+        """
+        started = last = time.monotonic()
+        for row in rows:
+            if cancel.is_set():
+                raise QueryCancelledError("Query cancelled.")
+            if self.on_query_wait is not None:
+                now = time.monotonic()
+                if now - last >= QUERY_WAIT_INTERVAL:
+                    last = now
+                    self.on_query_wait(now - started)
+            yield row
+
+    def enable_query_workers(self, processes: int = 2, timeout: float = 30.0, max_rows: Optional[int] = 100_000):
+        """
+        Runs SPARQL from run_sparql_query/get_sparql_page in worker processes holding a
+        read-only copy of the loaded graph, with a per-query wall-clock timeout and row
+        limit. Sessions of a shared ontology use one pool (the first to need it sets the
+        process count); edits are sent with each query rather than copied into the
+        workers. Queries run in-process while reasoning is enabled.
+        """
+        self._worker_settings = {"processes": processes, "timeout": timeout, "max_rows": max_rows}
+
+    @property
+    def query_workers_enabled(self) -> bool:
+        return self._worker_settings is not None
+
+    def disable_query_workers(self):
+        """Queries run in-process again. Stops this session's own pool (not a shared ontology's)."""
+        self._worker_settings = None
+        self._shutdown_worker_pool()
+
+    def cancel_running_queries(self):
+        """Aborts this session's running query (call from another thread than the one waiting on it)."""
+        self._query_cancel.set()
+
+    def _loaded_store(self):
+        """The store of the graph as loaded, under this session's overlay if it has edits."""
+        store = self.graph.store
+        return store.base if isinstance(store, OverlayStore) else store
+
+    def _get_worker_pool(self) -> Optional[SparqlWorkerPool]:
+        if self._worker_settings is None or self.materializer is not None:
+            return None # Inferred triples are not in the loaded graph
+        owner = self._shared_base if self._shared_base is not None else self
+        store = self._loaded_store()
+        with owner._worker_lock:
+            if owner._worker_pool is not None and owner._worker_pool_store is store:
+                return owner._worker_pool
+            owner._shutdown_worker_pool()
+            if owner._store_path:
+                source = {"sqlite": owner._store_path} # Workers open the same on-disk store read-only
+            elif owner._snapshot_file and os.path.exists(owner._snapshot_file[0]):
+                source = {"snapshot": owner._snapshot_file[0]} # Snapshot of the graph as loaded
+            else:
+                fd, snapshot_path = tempfile.mkstemp(prefix="ragui-workers-", suffix=".snap")
+                os.close(fd)
+                if not owner._write_snapshot(snapshot_path, Graph(store=store, identifier=self.graph.identifier)):
+                    raise RuntimeError("Could not write graph snapshot for query workers.")
+                owner._worker_snapshot = snapshot_path
+                source = {"snapshot": snapshot_path}
+            owner._worker_pool = SparqlWorkerPool(source, processes=self._worker_settings["processes"],
+                                                  timeout=None, max_rows=None)
+            owner._worker_pool_store = store
+            # A registered ontology is dropped when its last session goes; its workers go with it
+            owner._worker_finalizer = weakref.finalize(owner, _close_worker_pool, owner._worker_pool, owner._worker_snapshot)
+            return owner._worker_pool
+
+    def _get_worker_delta(self, pool: SparqlWorkerPool) -> Optional[Dict[str, Any]]:
+        """This session's edits in the form the workers apply them, or None if it has none."""
+        store = self.graph.store
+        if not isinstance(store, OverlayStore):
+            return None
+        if self._worker_delta is None or self._worker_delta[0] != self.graph_version:
+            added = (triple for triple, _ in store.added.triples((None, None, None)))
+            self._worker_delta = (self.graph_version, {
+                "key": f"{self._session_token}:{self.graph_version}",
+                "add": _encode_triples(added),
+                "remove": _encode_triples(store.removed),
+            })
+        return self._worker_delta[1]
+
+    def _shutdown_worker_pool(self):
+        if self._worker_pool is not None:
+            self._worker_finalizer()
+            self._worker_finalizer = None
+            self._worker_pool = None
+            self._worker_pool_store = None
+            self._worker_snapshot = None
+
+    @staticmethod
+    def _init_bindings(bindings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {str(var).lstrip("?$"): value if isinstance(value, rdflib.term.Node) else Literal(value)
+                for var, value in (bindings or {}).items()}
+
+    def _execute_query(self, query: str, normalized: str, init_bindings: Dict[str, Any]):
+        compiled = self.prepared_queries.get(query, key=normalized)
+        return self._query_graph().query(compiled, initBindings=init_bindings)
+
+    @staticmethod
+    def _iter_bindings(results) -> Iterator:
+        # Iterating a SELECT result evaluates it row by row, so callers can stop early
+        # (limits, cancellation); rows are ResultRows, looked up by variable like bindings
+        return iter(results) if results.type == "SELECT" else iter(results.bindings)
+
+    @staticmethod
+    def _convert_term(val) -> Any:
+        # Convert RDFLib terms to python types for easier display/JSON
+        if val is None:
+            return None # Variable was not bound in this row
+        if isinstance(val, URIRef):
+            return str(val)
+        if isinstance(val, Literal):
+            return val.toPython()
+        return str(val) # Blank nodes etc.
+
+    def _iter_rows(self, results) -> Iterator[Dict[str, Any]]:
+        variables = [(var, str(var)) for var in (results.vars or [])]
+        for binding in self._iter_bindings(results):
+            yield {name: self._convert_term(binding.get(var)) for var, name in variables}
+
+    def _guarded_rows(self, results) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from self._iter_rows(results)
+        except Exception as e:
+            print(f"Error executing SPARQL query: {e}")
+
+    def get_query_plans(self) -> List[Dict[str, Any]]:
+        """
+        Recent queries, oldest first, with their join order and estimated cost next to the
+        actual result size and time: {"query", "bgps", "estimated_cost", "actual_rows", "elapsed_ms"}.
+        Each BGP entry lists its patterns in evaluation order with estimated rows and cost.
+        """
+        return list(self.query_plans)
+
+    def get_query_cache_stats(self) -> Dict[str, Any]:
+        """Returns counters for the SPARQL result cache and the prepared-query cache."""
+        return {**self.query_cache.stats(), "prepared": self.prepared_queries.stats(), "entities": self.entity_cache.stats()}
 
     def get_label(self, uri_str: str) -> Optional[str]:
-        """Tries to get an rdfs:label for a given URI."""
+        """Returns the preferred label (rdfs:label, then skos:prefLabel/altLabel) for a URI."""
         if not self.graph: return None
-        try:
-            uri = URIRef(uri_str)
-            label = self.graph.value(subject=uri, predicate=RDFS.label)
-            return str(label) if label else None
-        except: # Handle invalid URIs etc.
+        return self.labels.preferred_label(uri_str)
+
+    def get_all_labels(self) -> LabelsView:
+        """Returns a URI -> label mapping. This is a live view over the label index, not a copy."""
+        return LabelsView(self.labels)
+
+    def find_by_label(self, text: str, mode: str = "normalized", limit: Optional[int] = None) -> List[str]:
+        """Finds entity URIs by label or URI fragment ('exact', 'normalized' or 'prefix' match)."""
+        if not self.graph: return []
+        return self.labels.lookup(text, mode=mode, limit=limit)
+
+    def search_text(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Keyword search over labels, comments, definitions and other annotation literals.
+        Returns up to limit {"uri", "label", "score", "snippet"} dicts, best match first.
+        """
+        if not self.graph: return []
+        tokens = set(text_tokens(text))
+        results = []
+        for uri, score in self._lazy_index("text_index").search(text, limit):
+            snippet = None
+            for pred in TEXT_PREDICATE_WEIGHTS: # Show the first literal that matched
+                snippet = next((str(o) for o in self.graph.objects(URIRef(uri), pred)
+                                if isinstance(o, Literal) and tokens.intersection(text_tokens(str(o)))), None)
+                if snippet:
+                    break
+            results.append({"uri": uri, "label": self.labels.preferred_label(uri) or uri_fragment(uri),
+                            "score": round(score, 4), "snippet": snippet})
+        return results
+
+    def _concept_texts(self) -> List[Tuple[str, str]]:
+        """(uri, text) for every class, property and individual: labels, local name and descriptions."""
+        schema_types = {str(t) for t in NON_INDIVIDUAL_TYPES} | {str(OWL.NamedIndividual)}
+        uris = dict.fromkeys(itertools.chain(self.classification.classes, self.hierarchy,
+                                             self.classification.properties, self.classification.individuals))
+        entries = []
+        for uri in uris:
+            if uri in schema_types:
+                continue
+            parts = self.labels.labels_for(uri) or [uri_fragment(uri)]
+            for pred in DESCRIPTION_PREDICATES:
+                parts.extend(str(o) for o in self.graph.objects(URIRef(uri), pred) if isinstance(o, Literal))
+            entries.append((uri, ". ".join(parts)))
+        return entries
+
+    def _get_concept_embeddings(self) -> ConceptEmbeddings:
+        """
+        Embeddings of the current graph's concepts. While the graph is unchanged since it was
+        loaded from (or saved to) a snapshot, the matrix is memory-mapped from a .npy next
+        to that snapshot, written there on first use. Edits make it be rebuilt in memory.
+        """
+        if self.concept_embeddings is not None:
+            return self.concept_embeddings
+        path = None
+        if self._snapshot_file and self._snapshot_file[1] == self.graph_version:
+            path = f"{self._snapshot_file[0]}.emb.npy"
+            self.concept_embeddings = ConceptEmbeddings.load(path, self.embedder)
+        if self.concept_embeddings is None:
+            self.concept_embeddings = ConceptEmbeddings.build(self._concept_texts(), self.embedder)
+            if path and self.concept_embeddings.save(path):
+                self.concept_embeddings = ConceptEmbeddings.load(path, self.embedder) or self.concept_embeddings
+        return self.concept_embeddings
+
+    def find_similar_concepts(self, texts: List[str], limit: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Embedding search: for each text (one batched matrix product), the limit concepts
+        with the closest label/description embedding. Returns one list per text of
+        {"uri", "label", "score"} dicts, best first.
+        """
+        if not self.graph: return [[] for _ in texts]
+        return [[{"uri": uri, "label": self.labels.preferred_label(uri) or uri_fragment(uri), "score": round(score, 4)}
+                 for uri, score in matches]
+                for matches in self._get_concept_embeddings().search(texts, limit)]
+
+    def match_terms(self, terms: Iterable[str], candidates: int = 3) -> List[Dict[str, Any]]:
+        """
+        Classifies every term against all labels and URI fragments without an LLM:
+        'exact', 'normalized' (case, camelCase, plurals/stemming), 'acronym', 'ambiguous'
+        (no match, but a label within AMBIGUOUS_MATCH_SCORE trigram similarity) or 'unknown'.
+        Returns one {"term", "status", "uris", "candidates"} dict per distinct term, in order;
+        candidates (from get_alignment_candidates, lexical only) are filled for ambiguous terms.
+        """
+        if not self.graph: return []
+        matcher = self._lazy_index("term_matcher")
+        results = []
+        for term in dict.fromkeys(terms):
+            status, uris = matcher.match(term)
+            close = []
+            if status == "unknown":
+                close = self.get_alignment_candidates(term, candidates, semantic=False)
+                if close and close[0]["score"] >= AMBIGUOUS_MATCH_SCORE:
+                    status = "ambiguous"
+                else:
+                    close = []
+            results.append({"term": term, "status": status, "uris": uris, "candidates": close})
+        return results
+
+    def get_alignment_candidates(self, text: str, limit: int = 10, semantic: bool = True) -> List[Dict[str, Any]]:
+        """
+        Closest concepts to a piece of text by character trigram similarity over all labels
+        and URI fragments (tolerates typos, word order, camelCase and plurals). With semantic,
+        up to limit more concepts found only by embedding similarity (labels and descriptions,
+        see find_similar_concepts) follow, with "matched" None.
+        Returns {"uri", "label", "type", "score", "matched", "source"} dicts, best first per source.
+        """
+        if not self.graph: return []
+        hits = [(uri, score, matched, "lexical") for uri, score, matched in self._lazy_index("ngram_index").search(text, limit)]
+        if semantic:
+            seen = {uri for uri, *_ in hits}
+            hits.extend((m["uri"], m["score"], None, "embedding") for m in self.find_similar_concepts([text], limit)[0]
+                        if m["uri"] not in seen)
+        candidates = []
+        for uri, score, matched, source in hits:
+            if uri in self.classification.classes:
+                kind = "Class"
+            elif uri in self.classification.properties:
+                kind = "Property"
+            else:
+                kind = "Individual"
+            candidates.append({"uri": uri, "label": self.labels.preferred_label(uri) or uri_fragment(uri),
+                               "type": kind, "score": round(score, 4), "matched": matched, "source": source})
+        return candidates
+
+    def get_entity_details(self, uri_str: str, depth: int = ENTITY_DETAIL_DEPTH, max_edges: int = ENTITY_DETAIL_FANOUT) -> Optional[Dict[str, Any]]:
+        """
+        Describes an entity for explanations: labels, types, superclasses, descriptions and
+        its outgoing/incoming edges. With depth > 1, edges of neighbouring entities are
+        added (breadth-first) under "neighborhood". At most max_edges edges are read per
+        entity and direction. Results are cached per (URI, depth, max_edges) until the graph
+        changes and may be shared with the cache, so they should not be modified.
+        Returns None if the entity does not occur in the graph.
+        """
+        if not self.graph: return None
+        cache_key = (uri_str, depth, max_edges, self.graph_version)
+        details = self.entity_cache.get(cache_key)
+        if details is not None:
+            return details
+        graph = self._query_graph()
+        node = URIRef(uri_str)
+        outgoing, out_truncated = self._entity_edges(graph, node, "out", max_edges)
+        incoming, in_truncated = self._entity_edges(graph, node, "in", max_edges)
+        types = [str(t) for t in itertools.islice(graph.objects(node, RDF.type), max_edges)]
+        descriptions = [str(d) for pred in DESCRIPTION_PREDICATES for d in itertools.islice(graph.objects(node, pred), max_edges)]
+        labels = self.labels.labels_for(uri_str, include_fragment=False)
+        if not (outgoing or incoming or out_truncated or in_truncated or types or descriptions or labels):
             return None
+        details = {
+            "uri": uri_str,
+            "label": labels[0] if labels else uri_fragment(uri_str),
+            "labels": labels,
+            "types": types,
+            "superclasses": self.hierarchy.ancestors(uri_str),
+            "instance_count": self.hierarchy.instance_count(uri_str), # Direct instances, if a class
+            "descriptions": descriptions,
+            "outgoing": outgoing,
+            "incoming": incoming,
+            "truncated": out_truncated or in_truncated,
+        }
+        if depth > 1:
+            details["neighborhood"] = self._entity_neighborhood(graph, node, outgoing + incoming, depth, max_edges)
+        edges = outgoing + incoming + details.get("neighborhood", [])
+        self.entity_cache.put(cache_key, details, size=estimate_result_size(edges) + 1024)
+        return details
+
+    def _node_label(self, term) -> str:
+        if isinstance(term, URIRef):
+            return self.labels.preferred_label(str(term)) or uri_fragment(str(term))
+        return str(term)
+
+    def _entity_edges(self, graph: Graph, node, direction: str, max_edges: int) -> Tuple[List[Dict[str, str]], bool]:
+        """
+        Up to max_edges edges of node (types, labels and descriptions excluded), and whether
+        more may exist. At most ENTITY_DETAIL_SCAN_LIMIT triples are read, skipped ones included.
+        """
+        skip = {RDF.type, *LABEL_PREDICATES, *DESCRIPTION_PREDICATES}
+        pattern = (node, None, None) if direction == "out" else (None, None, node)
+        edges = []
+        for scanned, (s, p, o) in enumerate(graph.triples(pattern)):
+            if scanned == ENTITY_DETAIL_SCAN_LIMIT:
+                return edges, True
+            if p in skip:
+                continue
+            if len(edges) == max_edges:
+                return edges, True
+            other = o if direction == "out" else s
+            edges.append({
+                "predicate": str(p),
+                "predicate_label": self._node_label(p),
+                "direction": direction,
+                "node": str(other),
+                "node_label": self._node_label(other),
+                "node_kind": "uri" if isinstance(other, URIRef) else "literal" if isinstance(other, Literal) else "bnode",
+            })
+        return edges, False
+
+    def _entity_neighborhood(self, graph: Graph, node, first_hop: List[Dict[str, str]], depth: int, max_edges: int) -> List[Dict[str, Any]]:
+        """Edges of entities 2..depth hops away, breadth-first, each entity expanded once."""
+        seen = {str(node)}
+        frontier = [edge["node"] for edge in first_hop if edge["node_kind"] == "uri"]
+        neighborhood: List[Dict[str, Any]] = []
+        for hop in range(2, depth + 1):
+            next_frontier = []
+            for uri in frontier:
+                if uri in seen:
+                    continue
+                seen.add(uri)
+                for direction in ("out", "in"):
+                    edges, _ = self._entity_edges(graph, URIRef(uri), direction, max_edges)
+                    for edge in edges:
+                        if edge["node"] == str(node):
+                            continue # Already listed as a first-hop edge
+                        neighborhood.append({"from": uri, "hop": hop, **edge})
+                        if edge["node_kind"] == "uri":
+                            next_frontier.append(edge["node"])
+            frontier = next_frontier
+        return neighborhood
+
+    def _uri(self, value) -> URIRef:
+        """Interns URIRefs so repeated URIs in batches share one object. Raises ValueError for invalid IRIs."""
+        if isinstance(value, URIRef):
+            value = str(value)
+        uri = self._uri_cache.get(value)
+        if uri is None:
+            if not isinstance(value, str) or not value or _INVALID_URI_RE.search(value):
+                raise ValueError(f"invalid URI {value!r}")
+            if len(self._uri_cache) >= 100_000:
+                self._uri_cache.clear()
+            uri = self._uri_cache[value] = URIRef(value)
+        return uri
+
+    def _to_triple(self, item) -> Tuple:
+        """Converts (subj, pred, obj[, is_object_literal]) of strings or RDFLib terms to a validated triple."""
+        if not isinstance(item, (tuple, list)) or len(item) not in (3, 4):
+            raise ValueError("expected (subject, predicate, object[, is_object_literal])")
+        subj, pred, obj = item[:3]
+        is_object_literal = bool(item[3]) if len(item) == 4 else False
+        if isinstance(subj, Literal) or isinstance(pred, (Literal, BNode)):
+            raise ValueError("literals cannot be subjects and predicates must be URIs")
+        s = subj if isinstance(subj, BNode) else self._uri(subj)
+        p = self._uri(pred)
+        if isinstance(obj, (Literal, BNode)):
+            o = obj
+        elif is_object_literal:
+            o = Literal(obj)
+        else:
+            o = self._uri(obj)
+        return (s, p, o)
 
     def add_triple(self, subj: str, pred: str, obj: str, is_object_literal: bool = False):
         """Adds a triple to the graph (basic). Needs proper URI handling."""
         if not self.graph: return False
         try:
-            s = URIRef(subj) # Assuming subj/pred are URIs
-            p = URIRef(pred)
-            o = Literal(obj) if is_object_literal else URIRef(obj)
-            self.graph.add((s, p, o))
+            triple = self._to_triple((subj, pred, obj, is_object_literal))
+            if triple in self.graph:
+                return True # Already present
+            self._ensure_writable()
+            self.graph.add(triple)
+            self._index_triples([triple])
+            self.added_since_load[triple] = None
+            self._journal_edit([triple], [])
             return True
         except Exception as e:
             print(f"Error adding triple: {e}")
             return False
+
+    def remove_triple(self, subj: str, pred: str, obj: str, is_object_literal: bool = False) -> bool:
+        """Removes a triple from the graph. Returns False if it could not be removed."""
+        if not self.graph: return False
+        try:
+            triple = self._to_triple((subj, pred, obj, is_object_literal))
+            if triple not in self.graph:
+                return True # Nothing to remove
+            self._apply_delta([], [triple])
+            self._journal_edit([], [triple])
+            return True
+        except Exception as e:
+            print(f"Error removing triple: {e}")
+            return False
+
+    def _open_journal(self, file_path: str, file_format: str):
+        """Opens this session's edit journal of a source file; without it, edits are not journaled."""
+        key = self._source_key(file_path, file_format)
+        if key is None:
+            return
+        journal = ChangeJournal(os.path.join(self.journal_dir, key, self.journal_name))
+        try:
+            journal.open()
+        except JournalLockedError as e:
+            print(f"{e}; edits in this session will not be journaled.")
+            return
+        self.journal = journal
+
+    def _replay_journal(self, base_snapshot: Optional[str] = None):
+        """
+        Applies the journaled edits to the loaded graph as one delta. base_snapshot is a
+        journal snapshot the graph does not reflect yet (shared sessions load the source).
+        """
+        net: Dict[Tuple, bool] = {} # triple -> present after replay
+        if base_snapshot:
+            added, removed = self._diff_graph(self._read_snapshot(base_snapshot))
+            net.update(dict.fromkeys(added, True))
+            net.update(dict.fromkeys(removed, False))
+        for entry in self.journal.applied():
+            net.update((tuple(map(_decode_term, t)), False) for t in entry["remove"])
+            net.update((tuple(map(_decode_term, t)), True) for t in entry["add"])
+        added = [t for t, present in net.items() if present and t not in self.graph]
+        removed = [t for t, present in net.items() if not present and t in self.graph]
+        self._apply_delta(added, removed)
+        if added or removed:
+            print(f"Replayed edit journal: {len(added)} triples added, {len(removed)} removed.")
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _journal_edit(self, added: List[Tuple], removed: List[Tuple]):
+        """Appends an applied edit to the journal, compacting it into a snapshot when it gets long."""
+        if self.journal is None or not (added or removed):
+            return
+        encode = lambda triples: [[_encode_term(term) for term in t] for t in triples]
+        self.journal.record_edit(encode(added), encode(removed))
+        if self.journal.needs_compaction():
+            self.journal.compact(self._write_snapshot)
+
+    def undo(self) -> bool:
+        """Reverts the most recent journaled edit. Returns False if there is nothing to undo."""
+        entry = self.journal.undo() if self.journal is not None else None
+        if entry is None:
+            return False
+        self._apply_journal_entry(entry, reverse=True)
+        return True
+
+    def redo(self) -> bool:
+        """Re-applies the most recently undone edit. Returns False if there is nothing to redo."""
+        entry = self.journal.redo() if self.journal is not None else None
+        if entry is None:
+            return False
+        self._apply_journal_entry(entry, reverse=False)
+        return True
+
+    def _apply_journal_entry(self, entry: Dict[str, Any], reverse: bool):
+        added = [tuple(map(_decode_term, t)) for t in entry["add"]]
+        removed = [tuple(map(_decode_term, t)) for t in entry["remove"]]
+        if reverse:
+            added, removed = removed, added
+        self._apply_delta([t for t in added if t not in self.graph], [t for t in removed if t in self.graph])
+
+    def add_triples(self, triples: Optional[Iterable] = None, ttl: Optional[str] = None, all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Adds a batch of triples atomically: either every accepted triple is added or,
+        if the store fails part way, none are.
+
+        Args:
+            triples: Iterable of (subj, pred, obj) or (subj, pred, obj, is_object_literal),
+                as strings or RDFLib terms.
+            ttl: Alternatively (or additionally) a Turtle fragment; prefixes of the
+                loaded ontology may be used without declaring them.
+            all_or_nothing: Reject the whole batch if any item is invalid.
+
+        Returns:
+            {"success": bool, "inserted": [...], "duplicates": [...], "rejected": [{"triple", "reason"}]}
+            where triples are reported as (s, p, o) string tuples and success means the
+            accepted triples were applied (individual items may still have been rejected).
+        """
+        report = {"success": False, "inserted": [], "duplicates": [], "rejected": []}
+        if not self.graph:
+            report["rejected"].append({"triple": None, "reason": "no ontology loaded"})
+            return report
+
+        accepted = []
+        for item in triples or []:
+            try:
+                accepted.append(self._to_triple(item))
+            except ValueError as e:
+                report["rejected"].append({"triple": tuple(map(str, item)) if isinstance(item, (tuple, list)) else str(item), "reason": str(e)})
+        if ttl:
+            prefixes = "".join(f"@prefix {prefix}: <{ns}> .\n" for prefix, ns in self.namespaces.items())
+            fragment = Graph()
+            try:
+                fragment.parse(data=prefixes + ttl, format="turtle")
+                # Convert the whole fragment first: a rejected fragment must not contribute any triples
+                converted = [(s, self._uri(p), o if not isinstance(o, URIRef) else self._uri(o)) for s, p, o in fragment]
+                accepted.extend(converted)
+            except Exception as e:
+                report["rejected"].append({"triple": None, "reason": f"could not parse TTL fragment: {e}"})
+
+        if all_or_nothing and report["rejected"]:
+            report["rejected"].extend({"triple": tuple(map(str, t)), "reason": "batch rejected"} for t in accepted)
+            return report
+
+        new_triples = []
+        seen = set()
+        for triple in accepted:
+            if triple in seen or triple in self.graph:
+                report["duplicates"].append(tuple(map(str, triple)))
+            else:
+                seen.add(triple)
+                new_triples.append(triple)
+
+        try:
+            self._ensure_writable()
+            self.graph.addN((s, p, o, self.graph) for s, p, o in new_triples)
+        except Exception as e:
+            print(f"Error adding triples, rolling back batch: {e}")
+            for triple in new_triples: # Undo whatever was applied
+                self.graph.remove(triple)
+            report["rejected"].extend({"triple": tuple(map(str, t)), "reason": f"batch failed: {e}"} for t in new_triples)
+            return report
+
+        self._index_triples(new_triples)
+        self.added_since_load.update(dict.fromkeys(new_triples))
+        self._journal_edit(new_triples, [])
+        report["inserted"] = [tuple(map(str, t)) for t in new_triples]
+        report["success"] = True
+        return report
+
+    def export_ontology(self, destination: Union[str, IO], file_format: str = "nt", changes_only: bool = False) -> int:
+        """
+        Writes the graph (or, with changes_only, the triples added since it was loaded)
+        to a file path or an open file/buffer, streaming it in batches of lines instead of
+        building the document in memory. file_format is "nt" (N-Triples, in store order)
+        or "turtle" (subjects and predicates sorted, prefixes from the ontology).
+        Files are written under a temporary name and renamed when complete.
+        Returns the number of triples written, or -1 on failure (including an unknown format).
+        """
+        if file_format not in EXPORT_FORMATS:
+            print(f"Cannot export, unknown format '{file_format}' (expected one of {EXPORT_FORMATS}).")
+            return -1
+        if changes_only:
+            graph = self.graph
+            triples = [t for t in self.added_since_load if t in graph] # Some may have been removed since
+        else:
+            triples = None
+        try:
+            if not isinstance(destination, str):
+                return self._write_export(destination, file_format, triples)
+            tmp_path = f"{destination}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+                count = self._write_export(f, file_format, triples)
+            os.replace(tmp_path, destination)
+            print(f"Exported {count} triples to {destination}.")
+            return count
+        except Exception as e:
+            print(f"Error exporting ontology: {e}")
+            return -1
+
+    def _write_export(self, stream: IO, file_format: str, triples: Optional[List[Tuple]]) -> int:
+        if isinstance(stream, io.TextIOBase):
+            write = stream.write
+        else:
+            write = lambda text: stream.write(text.encode("utf-8")) # Binary files and download buffers
+        if file_format == "nt":
+            chunks = ((_nt_line(t), 1) for t in (triples if triples is not None else self.graph))
+        else:
+            chunks = self._turtle_chunks(triples)
+        count, batch = 0, []
+        for text, triple_count in chunks:
+            batch.append(text)
+            count += triple_count
+            if len(batch) >= EXPORT_BATCH_LINES:
+                write("".join(batch))
+                batch.clear()
+        if batch:
+            write("".join(batch))
+        return count
+
+    def _turtle_chunks(self, triples: Optional[List[Tuple]]) -> Iterator[Tuple[str, int]]:
+        """Turtle text, one subject block at a time, as (text, number of triples)."""
+        def _sort_key(term) -> Tuple[int, str]:
+            return (isinstance(term, BNode), str(term))
+
+        # One pass for the subject order and the vocabulary in use; only the subject list
+        # is held in memory, each block is then read back from the store
+        subjects, vocabulary = set(), set()
+        for s, p, o in (triples if triples is not None else self.graph):
+            subjects.add(s)
+            vocabulary.add(p)
+            if p == RDF.type:
+                vocabulary.add(o)
+        if triples is not None:
+            by_subject: Dict[Any, List[Tuple]] = {}
+            for s, p, o in triples:
+                by_subject.setdefault(s, []).append((p, o))
+            predicate_objects = by_subject.__getitem__
+        else:
+            predicate_objects = self.graph.predicate_objects
+
+        # The ontology's own prefixes, plus rdflib's built-in ones only if the predicates
+        # or classes use them (instead of all ~30 prefixes rdflib binds by default)
+        nsm = NamespaceManager(Graph(bind_namespaces="none"), bind_namespaces="none")
+        for prefix, ns in self.graph.namespaces():
+            if prefix == "xml":
+                continue
+            if RDFLIB_DEFAULT_PREFIXES.get(prefix) != str(ns) or any(str(term).startswith(str(ns)) for term in vocabulary):
+                nsm.bind(prefix, ns, override=True, replace=True)
+        for prefix, ns in sorted(nsm.namespaces()):
+            yield f"@prefix {prefix}: <{ns}> .\n", 0
+        yield "\n", 0
+
+        for subject in sorted(subjects, key=_sort_key):
+            pairs = sorted(predicate_objects(subject), key=lambda po: (po[0] != RDF.type, str(po[0]), str(po[1])))
+            lines, previous = [], None
+            for p, o in pairs:
+                obj = o.n3(nsm)
+                if p == previous:
+                    lines[-1] += f" ,\n        {obj}"
+                else:
+                    pred = "a" if p == RDF.type else p.n3(nsm)
+                    lines.append(f"    {pred} {obj}")
+                    previous = p
+            yield f"{subject.n3(nsm)}\n" + " ;\n".join(lines) + " .\n\n", len(pairs)
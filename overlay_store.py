@@ -0,0 +1,117 @@
+from typing import Iterator, Set, Tuple
+
+from rdflib.plugins.stores.memory import SimpleMemory
+from rdflib.store import Store
+
+# Copy-on-write view over a shared (read-only) store. Additions go to a small private
+# in-memory store and removals of shared triples are recorded as tombstones, so the
+# shared graph is never modified and other sessions never see this session's edits.
+
+
+class OverlayStore(Store):
+    """Reads see base + local additions - local removals; all writes stay local."""
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, base: Store):
+        super().__init__()
+        self.base = base
+        self.added = SimpleMemory()
+        self.added_count = 0 # SimpleMemory counts its triples by iterating them
+        self.removed: Set[Tuple] = set()
+        for prefix, namespace in base.namespaces():
+            self.added.bind(prefix, namespace)
+
+    def _base_has(self, triple: Tuple) -> bool:
+        return next(iter(self.base.triples(triple, None)), None) is not None
+
+    def _added_has(self, triple: Tuple) -> bool:
+        return next(iter(self.added.triples(triple, None)), None) is not None
+
+    def add(self, triple, context=None, quoted: bool = False):
+        if triple in self.removed:
+            self.removed.discard(triple)
+            if self._base_has(triple):
+                return
+        elif self._base_has(triple) or self._added_has(triple):
+            return
+        self.added.add(triple, None)
+        self.added_count += 1
+
+    def remove(self, triple_pattern, context=None):
+        for triple, _ in list(self.triples(triple_pattern)):
+            if self._added_has(triple):
+                self.added.remove(triple, None)
+                self.added_count -= 1
+            if self._base_has(triple):
+                self.removed.add(triple)
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        removed = self.removed
+        for triple, contexts in self.base.triples(triple_pattern, None):
+            if not removed or triple not in removed:
+                yield triple, contexts
+        yield from self.added.triples(triple_pattern, None)
+
+    def __len__(self, context=None) -> int:
+        return self.base.__len__() - len(self.removed) + self.added_count
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # Namespace bindings are kept locally too
+    def bind(self, prefix, namespace, override: bool = True):
+        self.added.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.added.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.added.prefix(namespace)
+
+    def namespaces(self):
+        return self.added.namespaces()
+
+
+class UnionStore(Store):
+    """Read-only union of two stores holding disjoint triples (e.g. asserted + inferred)."""
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, base: Store, extra: Store):
+        super().__init__()
+        self.base = base
+        self.extra = extra
+
+    def add(self, triple, context=None, quoted: bool = False):
+        raise TypeError("UnionStore is read-only")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("UnionStore is read-only")
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        yield from self.base.triples(triple_pattern, None)
+        yield from self.extra.triples(triple_pattern, None)
+
+    def __len__(self, context=None) -> int:
+        return self.base.__len__() + self.extra.__len__()
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # Namespace bindings come from the base store
+    def bind(self, prefix, namespace, override: bool = True):
+        self.base.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.base.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.base.prefix(namespace)
+
+    def namespaces(self):
+        return self.base.namespaces()
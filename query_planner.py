@@ -0,0 +1,229 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from rdflib import BNode, Graph, URIRef, Variable
+from rdflib.namespace import RDF
+from rdflib.paths import Path
+from rdflib.plugins.sparql.parserutils import CompValue
+
+from graph_columns import ColumnarGraph
+
+# Cardinality-based ordering of SPARQL basic graph patterns. rdflib evaluates the triple
+# patterns of a BGP in the order it is given them (after a sort on the number of bound
+# terms), so a query starting with `?s ?p ?o` enumerates the whole graph before the
+# selective patterns can prune it. Statistics collected once per load (on the first
+# planned query) estimate each pattern's result size, and patterns are ordered greedily:
+# the cheapest pattern that joins with what is already bound comes next. The same algebra
+# walk backs the static checks run on generated queries before evaluation (IRIs used,
+# cross products, LIMIT).
+
+
+class QueryStatistics:
+    """
+    Per-predicate and per-class cardinalities of a graph, for estimating pattern sizes.
+    Only the counts are kept (keyed by term); whether a constant occurs at all is looked
+    up in the graph itself.
+    """
+
+    def __init__(self, graph: Graph, total: int, distinct_subjects: int, distinct_objects: int,
+                 predicates: Dict[Any, Tuple[int, int, int]], class_counts: Dict[Any, int]):
+        self.graph = graph
+        self.total = total
+        self.distinct_subjects = distinct_subjects
+        self.distinct_objects = distinct_objects
+        self.predicates = predicates # predicate -> (triples, distinct subjects, distinct objects)
+        self.class_counts = class_counts # class -> direct rdf:type instances
+
+    @classmethod
+    def from_columnar(cls, view: ColumnarGraph, graph: Graph) -> "QueryStatistics":
+        """Vectorized counts from an already built columnar view of graph."""
+        distinct = view.distinct_counts()
+        p, o, s = view.pos
+        n_terms = max(len(view.terms), 1)
+        counts = np.bincount(p, minlength=n_terms)
+        # Distinct subjects / objects per predicate, from the distinct (p, s) and (p, o) pairs
+        subjects = np.bincount(np.unique(p.astype(np.int64) * n_terms + s) // n_terms, minlength=n_terms)
+        objects = np.bincount(np.unique(p.astype(np.int64) * n_terms + o) // n_terms, minlength=n_terms)
+        predicates = {view.terms[i]: (int(counts[i]), int(subjects[i]), int(objects[i])) for i in np.flatnonzero(counts)}
+        class_counts: Dict[Any, int] = {}
+        type_id = view.term_id(RDF.type)
+        if type_id is not None:
+            start, end = np.searchsorted(p, type_id, "left"), np.searchsorted(p, type_id, "right")
+            classes, instances = np.unique(o[start:end], return_counts=True)
+            class_counts = {view.terms[i]: int(n) for i, n in zip(classes, instances)}
+        return cls(graph, len(view), distinct["subjects"], distinct["objects"], predicates, class_counts)
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "QueryStatistics":
+        """Counts from one pass over the triples; only the sets of distinct terms are held meanwhile."""
+        per_predicate: Dict[Any, Tuple[List[int], Set, Set]] = {}
+        subjects, objects = set(), set()
+        for s, p, o in graph:
+            entry = per_predicate.get(p)
+            if entry is None:
+                entry = per_predicate[p] = ([0], set(), set())
+            entry[0][0] += 1
+            entry[1].add(s)
+            entry[2].add(o)
+            subjects.add(s)
+            objects.add(o)
+        predicates = {p: (count[0], len(subj), len(obj)) for p, (count, subj, obj) in per_predicate.items()}
+        class_counts = dict(Counter(graph.objects(None, RDF.type)))
+        return cls(graph, len(graph), len(subjects), len(objects), predicates, class_counts)
+
+    def _occurs(self, term) -> bool:
+        graph = self.graph
+        return (term, None, None) in graph or (None, None, term) in graph or (None, term, None) in graph
+
+    def estimate(self, pattern: Tuple, bound: Set) -> float:
+        """Expected number of matches of a triple pattern per binding of the variables in bound."""
+        s, p, o = pattern
+        def _is_bound(term) -> bool:
+            return not isinstance(term, (Variable, BNode)) or term in bound
+        for term in pattern:
+            if not isinstance(term, (Variable, BNode, Path)) and not self._occurs(term):
+                return 0.0 # Constant not in the graph: no matches
+        s_bound, o_bound = _is_bound(s), _is_bound(o)
+        if isinstance(p, (Variable, BNode, Path)):
+            # A property path is estimated as an unbound predicate
+            if not isinstance(p, Path) and p in bound:
+                count, subjects, objects = self.total / max(len(self.predicates), 1), 1.0, 1.0
+            else:
+                count, subjects, objects = self.total, self.distinct_subjects, self.distinct_objects
+        elif p == RDF.type and not isinstance(o, (Variable, BNode)):
+            count = subjects = self.class_counts.get(o, 0)
+            objects = 1
+            o_bound = False # Already accounted for by the class count
+        else:
+            count, subjects, objects = self.predicates.get(p, (0, 0, 0))
+        estimate = float(count)
+        if s_bound:
+            estimate /= max(float(subjects), 1.0)
+        if o_bound:
+            estimate /= max(float(objects), 1.0)
+        return estimate
+
+
+def _pattern_vars(pattern: Tuple) -> Set:
+    return {term for term in pattern if isinstance(term, (Variable, BNode))}
+
+
+def order_patterns(patterns: List[Tuple], stats: QueryStatistics, bound: Optional[Set] = None) -> Tuple[List[Tuple], float, float]:
+    """
+    Greedy join order for a BGP: repeatedly take the cheapest pattern among those that
+    share a variable with what is bound so far (any pattern if none does).
+    Returns (ordered patterns, estimated result rows, estimated cost), where the cost is
+    the sum of the estimated intermediate result sizes.
+    """
+    bound = set(bound or ())
+    remaining = list(patterns)
+    ordered: List[Tuple] = []
+    rows, cost = 1.0, 0.0
+    while remaining:
+        connected = [t for t in remaining if not _pattern_vars(t) or _pattern_vars(t) & bound]
+        candidates = connected if connected and ordered else remaining
+        best = min(candidates, key=lambda t: stats.estimate(t, bound))
+        rows *= stats.estimate(best, bound)
+        cost += rows
+        ordered.append(best)
+        remaining.remove(best)
+        bound |= _pattern_vars(best)
+    return ordered, rows, cost
+
+
+def _walk_bgps(algebra: CompValue, visit: Callable[[CompValue, Set], None]):
+    """Calls visit(bgp, outer) for every BGP, where outer holds the variables already bound when it is evaluated."""
+    def _walk(node: Any, outer: Set):
+        if isinstance(node, CompValue):
+            if node.name == "BGP":
+                visit(node, outer)
+            elif node.name == "LeftJoin":
+                # OPTIONAL parts are evaluated once per solution of the required part
+                _walk(node["p1"], outer)
+                _walk(node["p2"], outer | set(dict.get(node["p1"], "_vars") or ()))
+                _walk(dict.get(node, "expr"), outer)
+            else:
+                for key, value in node.items():
+                    if key != "_vars":
+                        _walk(value, outer)
+        elif isinstance(node, (list, tuple)):
+            for value in node:
+                _walk(value, outer)
+    _walk(algebra, set())
+
+
+def reorder_query(algebra: CompValue, stats: QueryStatistics) -> Dict[str, Any]:
+    """
+    Reorders every BGP of a translated query in place. Returns the plan:
+    {"bgps": [{"patterns": [...], "estimated_rows", "estimated_cost"}], "estimated_cost"}.
+    """
+    bgps: List[Dict[str, Any]] = []
+
+    def _reorder(node: CompValue, outer: Set):
+        ordered, rows, cost = order_patterns(node["triples"], stats, outer)
+        node["triples"] = ordered
+        bgps.append({"patterns": [" ".join(t.n3() for t in p) for p in ordered],
+                     "estimated_rows": round(rows, 1), "estimated_cost": round(cost, 1)})
+
+    _walk_bgps(algebra, _reorder)
+    return {"bgps": bgps, "estimated_cost": round(sum(b["estimated_cost"] for b in bgps), 1)}
+
+
+def _path_iris(path: Any) -> Iterator[URIRef]:
+    """IRIs used in a property path (or the predicate itself when it is an IRI)."""
+    if isinstance(path, URIRef):
+        yield path
+        return
+    for attr in ("args", "arg", "path"):
+        value = getattr(path, attr, None)
+        for part in value if isinstance(value, list) else [value] if value is not None else []:
+            yield from _path_iris(part)
+
+
+def pattern_iris(algebra: CompValue) -> List[Tuple[str, URIRef]]:
+    """(role, IRI) for every IRI in the query's triple patterns; role is 'predicate', 'class' or 'resource'."""
+    found: List[Tuple[str, URIRef]] = []
+
+    def _collect(node: CompValue, outer: Set):
+        for s, p, o in node["triples"]:
+            found.extend(("predicate", iri) for iri in _path_iris(p))
+            if isinstance(s, URIRef):
+                found.append(("resource", s))
+            if isinstance(o, URIRef):
+                found.append(("class" if p == RDF.type else "resource", o))
+
+    _walk_bgps(algebra, _collect)
+    return list(dict.fromkeys(found))
+
+
+def cartesian_products(algebra: CompValue) -> List[List[str]]:
+    """
+    Groups of triple patterns that share no variable with the rest of their BGP (or
+    with the variables bound around it), i.e. BGPs evaluated as a cross product.
+    Each finding lists the patterns of every disconnected group.
+    """
+    findings: List[List[str]] = []
+
+    def _check(node: CompValue, outer: Set):
+        # (variables, patterns) per connected group; the enclosing pattern's variables start one
+        groups: List[Tuple[Set, List[Tuple]]] = [(set(outer), [])] if outer else []
+        for triple in node["triples"]:
+            variables = _pattern_vars(triple)
+            if not variables:
+                continue # Ground patterns are existence checks, not joins
+            joined = [g for g in groups if g[0] & variables]
+            merged = (variables.union(*(g[0] for g in joined)), [t for g in joined for t in g[1]] + [triple])
+            groups = [g for g in groups if not g[0] & variables] + [merged]
+        if len(groups) > 1:
+            findings.append([" . ".join(" ".join(term.n3() for term in t) for t in patterns) or "(enclosing pattern)"
+                             for _, patterns in groups])
+
+    _walk_bgps(algebra, _check)
+    return findings
+
+
+def has_limit(algebra: CompValue) -> bool:
+    """Whether the query's outermost solution modifier bounds the number of results."""
+    top = dict.get(algebra, "p")
+    return isinstance(top, CompValue) and top.name == "Slice" and dict.get(top, "length") is not None
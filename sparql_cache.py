@@ -0,0 +1,118 @@
+import re
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+# Strings, IRIs and comments are matched first so whitespace inside them is preserved;
+# long (triple-quoted) strings before short ones, as they may span lines and contain '#'
+_QUERY_TOKEN_RE = re.compile(
+    r'("""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\''
+    r'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>\s]*>)|(?:\s+|#[^\n]*)+')
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a SPARQL query for cache keys: comments removed and runs of
+    whitespace collapsed, leaving string literals and IRIs untouched.
+    """
+    def _replace(match):
+        if match.group(1):
+            return match.group(1)
+        return " "
+    return _QUERY_TOKEN_RE.sub(_replace, query).strip()
+
+
+def estimate_result_size(rows: List[Dict[str, Any]]) -> int:
+    """Rough memory footprint (bytes) of a list of row dicts as returned by run_sparql_query."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row.values():
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryResultCache:
+    """
+    LRU cache of SPARQL results keyed on (normalized query, graph version).
+    Entries are evicted least-recently-used first once their estimated total size
+    exceeds max_bytes. Results larger than max_bytes are never cached.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # key -> (rows, size)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, rows: Any, size: Optional[int] = None):
+        """Caches rows under key; pass size for values that are not a list of row dicts."""
+        size = size if size is not None else estimate_result_size(rows)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (rows, size)
+        self.current_bytes += size
+        while self._entries and (self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class PreparedQueryCache:
+    """
+    Bounded LRU cache of compiled (parsed and algebra-translated) SPARQL queries,
+    keyed on normalized query text. compile_fn turns query text into the compiled form.
+    """
+    def __init__(self, compile_fn, max_entries: int = 128):
+        self.compile_fn = compile_fn
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str, key: Optional[str] = None) -> Any:
+        """Returns the compiled form of query, compiling it on a miss. Compile errors propagate."""
+        key = key if key is not None else normalize_query(query)
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        compiled = self.compile_fn(query)
+        self._entries[key] = compiled
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,230 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# SPARQL evaluation in rdflib is pure Python and cannot be interrupted from another
+# thread. Running it in worker processes keeps the Streamlit script thread (and the
+# GIL) free, and lets a runaway query be stopped by terminating its worker. A pool
+# holds the graph as loaded; a session that has edited it sends its edits (the overlay
+# delta) with each query, and the worker queries an overlay with that delta applied.
+
+class QueryLimitError(Exception):
+    """Raised when a query is stopped before completing (time limit, row limit or cancellation)."""
+
+class QueryTimeoutError(QueryLimitError):
+    pass
+
+class QueryRowLimitError(QueryLimitError):
+    pass
+
+class QueryCancelledError(QueryLimitError):
+    pass
+
+
+def _worker_main(conn, source: Dict[str, str]):
+    """
+    Worker process: opens a read-only copy of the graph, then serves queries.
+    source is {"snapshot": path} (a snapshot file) or {"sqlite": path} (an on-disk store).
+    """
+    from rdflib import Graph
+    from otology_processor import OntologyProcessor, _decode_triples # Imported here to avoid a circular import
+    from overlay_store import OverlayStore
+    from sparql_cache import normalize_query
+    from sqlite_store import open_sqlite_graph
+
+    processor = OntologyProcessor(snapshot_dir=None)
+    if "sqlite" in source:
+        try:
+            processor.graph = open_sqlite_graph(source["sqlite"], read_only=True)
+        except Exception as e:
+            conn.send(("error", f"Worker could not open ontology store: {e}"))
+            return
+    elif not processor._load_snapshot(source["snapshot"], indexes=False):
+        conn.send(("error", f"Worker could not load ontology snapshot {source['snapshot']}"))
+        return
+    processor._get_query_statistics() # Workers reorder joins like the parent; collect before taking queries
+    conn.send(("ready", len(processor.graph)))
+    loaded_graph = processor.graph
+    delta_key = None # Delta the current overlay holds; consecutive queries of one session reuse it
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None: # Shutdown
+            return
+        try:
+            delta = request.get("delta")
+            if delta is None:
+                processor.graph, delta_key = loaded_graph, None
+            elif delta["key"] != delta_key:
+                overlay = Graph(store=OverlayStore(loaded_graph.store))
+                overlay.addN((s, p, o, overlay) for s, p, o in _decode_triples(*delta["add"]))
+                for triple in _decode_triples(*delta["remove"]):
+                    overlay.remove(triple)
+                processor.graph, delta_key = overlay, delta["key"]
+            results = processor._execute_query(request["query"], normalize_query(request["query"]), request["bindings"])
+            rows = itertools.islice(processor._iter_rows(results), request["offset"], None)
+            limit, max_rows = request["limit"], request["max_rows"]
+            output = []
+            hit_row_limit = False
+            for row in rows:
+                if limit is not None and len(output) >= limit:
+                    break
+                if max_rows is not None and len(output) >= max_rows:
+                    hit_row_limit = True
+                    break
+                output.append(row)
+            conn.send(("row_limit", max_rows) if hit_row_limit else ("ok", output))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, ctx, source: Dict[str, str]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, source), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(1)
+        self.conn.close()
+
+
+class SparqlWorkerPool:
+    """
+    Pool of worker processes, each holding a read-only copy of one loaded graph (from a
+    snapshot file or an on-disk store). Queries run with a wall-clock timeout and a
+    row-count limit; a query that hits a limit or is cancelled has its worker
+    terminated and replaced. Safe to share between sessions (threads).
+    """
+    def __init__(self, source: Dict[str, str], processes: int = 2,
+                 timeout: float = 30.0, max_rows: Optional[int] = 100_000, startup_timeout: float = 600.0,
+                 poll_interval: float = 0.05):
+        self.source = source
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.startup_timeout = startup_timeout
+        self.poll_interval = poll_interval
+        self._ctx = multiprocessing.get_context("spawn") # Forking a threaded server process is unsafe
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._generation = 0 # Incremented by cancel_all(); queries started earlier abort
+        self._closed = False
+        for _ in range(max(1, processes)):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.source)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def cancel_all(self):
+        """Aborts every query currently running (or waiting for a worker)."""
+        with self._lock:
+            self._generation += 1
+
+    def run(self, query: str, bindings: Optional[Dict[str, Any]] = None, offset: int = 0, limit: Optional[int] = None,
+            timeout: Optional[float] = None, max_rows: Optional[int] = None,
+            cancel_event: Optional[threading.Event] = None,
+            on_wait: Optional[Callable[[float], None]] = None,
+            delta: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Runs a query in a worker and returns its rows (after skipping `offset`, at
+        most `limit`). Raises QueryLimitError subclasses when a limit is hit or the
+        query is cancelled, and RuntimeError for query errors. on_wait(elapsed seconds)
+        is called while waiting; an exception raised from it cancels the query. delta
+        is {"key", "add", "remove"} (encoded triples) to query the loaded graph with
+        a session's edits applied; key identifies the delta's content.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        max_rows = self.max_rows if max_rows is None else max_rows
+        generation = self._generation
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+
+        def _check_abort():
+            if on_wait is not None:
+                on_wait(time.monotonic() - started)
+            if self._generation != generation or (cancel_event is not None and cancel_event.is_set()):
+                raise QueryCancelledError("Query cancelled.")
+            if deadline is not None and time.monotonic() > deadline:
+                raise QueryTimeoutError(f"Query exceeded the time limit of {timeout:g}s.")
+
+        worker = None
+        while worker is None:
+            _check_abort()
+            try:
+                worker = self._idle.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+
+        try:
+            if not worker.ready:
+                # Loading the graph copy does not count towards the query's time limit
+                startup_deadline = time.monotonic() + self.startup_timeout
+                while not worker.conn.poll(self.poll_interval):
+                    if on_wait is not None:
+                        on_wait(time.monotonic() - started)
+                    if self._generation != generation or (cancel_event is not None and cancel_event.is_set()):
+                        raise QueryCancelledError("Query cancelled.")
+                    if time.monotonic() > startup_deadline or not worker.process.is_alive():
+                        raise RuntimeError("Query worker failed to start.")
+                status, payload = worker.conn.recv()
+                if status != "ready":
+                    raise RuntimeError(payload)
+                worker.ready = True
+                if deadline is not None:
+                    deadline = time.monotonic() + timeout
+
+            worker.conn.send({"query": query, "bindings": bindings or {}, "offset": offset, "limit": limit,
+                              "max_rows": max_rows, "delta": delta})
+            while not worker.conn.poll(self.poll_interval):
+                _check_abort()
+                if not worker.process.is_alive():
+                    raise RuntimeError("Query worker exited unexpectedly.")
+            status, payload = worker.conn.recv()
+        except BaseException:
+            # The worker may be mid-query; terminating it is the only way to stop rdflib
+            self._replace(worker)
+            raise
+
+        self._idle.put(worker)
+        if status == "ok":
+            return payload
+        if status == "row_limit":
+            raise QueryRowLimitError(f"Query returned more than {payload} rows.")
+        raise RuntimeError(payload)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._all)
+            self._all.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            worker.kill()
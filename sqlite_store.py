@@ -0,0 +1,320 @@
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF
+from rdflib.store import Store, VALID_STORE, NO_STORE
+
+# On-disk rdflib Store backed by SQLite. Terms are interned into a `terms` table and
+# triples are stored as integer ids with one index per access path (SPO primary key,
+# plus POS and OSP), so any triple pattern is answered by an index range scan.
+
+_TERM_URI, _TERM_BNODE, _TERM_LITERAL = 0, 1, 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (value, kind, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL);
+"""
+
+# Staging tables for add_encoded (per connection, never persisted)
+_CHUNK_SCHEMA = (
+    "CREATE TEMP TABLE IF NOT EXISTS chunk_terms (pos INTEGER PRIMARY KEY, kind INTEGER, value TEXT, datatype TEXT, lang TEXT, id INTEGER)",
+    "CREATE TEMP TABLE IF NOT EXISTS chunk_triples (s INTEGER, p INTEGER, o INTEGER)",
+)
+
+_SELECT_TRIPLES = """
+SELECT t.s, s.kind, s.value, s.datatype, s.lang,
+       t.p, p.kind, p.value, p.datatype, p.lang,
+       t.o, o.kind, o.value, o.datatype, o.lang
+FROM triples t
+JOIN terms s ON s.id = t.s
+JOIN terms p ON p.id = t.p
+JOIN terms o ON o.id = t.o
+"""
+
+def _term_row(term) -> Tuple[int, str, str, str]:
+    if isinstance(term, Literal):
+        return (_TERM_LITERAL, str(term), str(term.datatype) if term.datatype else "", term.language or "")
+    if isinstance(term, BNode):
+        return (_TERM_BNODE, str(term), "", "")
+    return (_TERM_URI, str(term), "", "")
+
+def _row_term(kind: int, value: str, datatype: str, lang: str):
+    if kind == _TERM_LITERAL:
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    if kind == _TERM_BNODE:
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    """
+    Non-context-aware rdflib Store persisted in a single SQLite file.
+    Writes are transactional: call commit() (or Graph.commit()) to make them durable.
+    """
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    # Bound on the term -> id cache used when writing
+    TERM_CACHE_SIZE = 200_000
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None, read_only: bool = False):
+        self.read_only = read_only
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._term_ids: Dict[Any, int] = {}
+        self._count = 0
+        self._prefix_to_ns: Dict[str, URIRef] = {}
+        self._ns_to_prefix: Dict[URIRef, str] = {}
+        super().__init__(configuration, identifier)
+
+    # --- Store management ---
+    def open(self, configuration: str, create: bool = True) -> int:
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        if self.read_only:
+            self._conn = sqlite3.connect(f"file:{configuration}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(configuration)), exist_ok=True)
+            self._conn = sqlite3.connect(configuration, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL") # Readers in other sessions don't block on writers
+            self._conn.execute("PRAGMA cache_size=-65536") # 64 MiB; bulk loads update three indexes at random positions
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+        for prefix, uri in self._conn.execute("SELECT prefix, uri FROM namespaces"):
+            self._prefix_to_ns[prefix] = URIRef(uri)
+            self._ns_to_prefix[URIRef(uri)] = prefix
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self._conn is None:
+            return
+        if commit_pending_transaction and not self.read_only:
+            self._conn.commit()
+        self._conn.close()
+        self._conn = None
+
+    def commit(self):
+        with self._lock:
+            if not self.read_only:
+                self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+            self._term_ids.clear() # Ids handed out inside the transaction are gone
+            self._count = self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    # --- Term ids ---
+    def _lookup_id(self, term) -> Optional[int]:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            kind, value, datatype, lang = _term_row(term)
+            row = self._conn.execute(
+                "SELECT id FROM terms WHERE value = ? AND kind = ? AND datatype = ? AND lang = ?",
+                (value, kind, datatype, lang)
+            ).fetchone()
+            if row is None:
+                return None
+            term_id = row[0]
+            self._cache_id(term, term_id)
+        return term_id
+
+    def _get_or_create_id(self, term) -> int:
+        term_id = self._lookup_id(term)
+        if term_id is None:
+            term_id = self._conn.execute(
+                "INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)", _term_row(term)
+            ).lastrowid
+            self._cache_id(term, term_id)
+        return term_id
+
+    def _cache_id(self, term, term_id: int):
+        if len(self._term_ids) >= self.TERM_CACHE_SIZE:
+            self._term_ids.clear()
+        self._term_ids[term] = term_id
+
+    # --- RDF API ---
+    def add(self, triple, context=None, quoted: bool = False):
+        with self._lock:
+            ids = tuple(self._get_or_create_id(term) for term in triple)
+            self._count += self._conn.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", ids).rowcount
+
+    def addN(self, quads):
+        with self._lock:
+            rows = (tuple(self._get_or_create_id(term) for term in (s, p, o)) for s, p, o, _ in quads)
+            self._count += self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", rows).rowcount
+
+    def add_encoded(self, terms, id_bytes: bytes):
+        """
+        Bulk-adds triples given as a term table of (kind, value[, datatype, lang]) tuples
+        and a flat native int64 array of (s, p, o) positions in that table. Terms are
+        interned and positions mapped to term ids inside SQLite, without rdflib terms.
+        """
+        ids = array("q")
+        ids.frombytes(id_bytes)
+        rows = ((pos, term[0], term[1], (term[2] or "") if len(term) > 2 else "", (term[3] or "") if len(term) > 3 else "")
+                for pos, term in enumerate(terms))
+        with self._lock:
+            conn = self._conn
+            for statement in _CHUNK_SCHEMA: # Not executescript(), which would commit the open transaction
+                conn.execute(statement)
+            try:
+                conn.executemany("INSERT INTO chunk_terms (pos, kind, value, datatype, lang) VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR IGNORE INTO terms (kind, value, datatype, lang) SELECT kind, value, datatype, lang FROM chunk_terms")
+                conn.execute("UPDATE chunk_terms SET id = (SELECT t.id FROM terms t WHERE t.value = chunk_terms.value AND "
+                             "t.kind = chunk_terms.kind AND t.datatype = chunk_terms.datatype AND t.lang = chunk_terms.lang)")
+                conn.executemany("INSERT INTO chunk_triples (s, p, o) VALUES (?, ?, ?)", zip(ids[0::3], ids[1::3], ids[2::3]))
+                self._count += conn.execute(
+                    "INSERT OR IGNORE INTO triples (s, p, o) SELECT ts.id, tp.id, tobj.id FROM chunk_triples c "
+                    "JOIN chunk_terms ts ON ts.pos = c.s JOIN chunk_terms tp ON tp.pos = c.p "
+                    "JOIN chunk_terms tobj ON tobj.pos = c.o").rowcount
+            finally:
+                conn.execute("DELETE FROM chunk_terms")
+                conn.execute("DELETE FROM chunk_triples")
+
+    def _where(self, pattern, alias: str = "t.") -> Optional[Tuple[str, list]]:
+        """SQL condition for a triple pattern, or None if a bound term is unknown (no matches possible)."""
+        clauses, params = [], []
+        for column, term in zip((f"{alias}s", f"{alias}p", f"{alias}o"), pattern):
+            if term is None:
+                continue
+            term_id = self._lookup_id(term)
+            if term_id is None:
+                return None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def remove(self, triple_pattern, context=None):
+        with self._lock:
+            where = self._where(triple_pattern, alias="")
+            if where is None:
+                return
+            clause, params = where
+            self._count -= self._conn.execute(f"DELETE FROM triples{clause}", params).rowcount
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        with self._lock:
+            where = self._where(triple_pattern)
+        if where is None:
+            return
+        clause, params = where
+        cursor = self._conn.execute(_SELECT_TRIPLES + clause, params)
+        decoded: Dict[int, Any] = {}
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            for row in rows:
+                terms = []
+                for offset in (0, 5, 10):
+                    term_id = row[offset]
+                    term = decoded.get(term_id)
+                    if term is None:
+                        term = decoded[term_id] = _row_term(*row[offset + 1:offset + 5])
+                    terms.append(term)
+                yield tuple(terms), iter(())
+            if len(decoded) > 100_000:
+                decoded.clear()
+
+    def __len__(self, context=None) -> int:
+        return self._count
+
+    def cardinalities(self) -> Dict[str, Any]:
+        """
+        Counts for query planning, computed by SQL aggregates over the indexes instead of
+        reading the triples: total and distinct subject/object counts, (triples, distinct
+        subjects, distinct objects) per predicate, and direct rdf:type instances per class.
+        """
+        with self._lock:
+            conn = self._conn
+            predicates = {
+                _row_term(*row[:4]): tuple(row[4:])
+                for row in conn.execute(
+                    "SELECT t.kind, t.value, t.datatype, t.lang, c.n, c.subjects, c.objects FROM "
+                    "(SELECT p, COUNT(*) AS n, COUNT(DISTINCT s) AS subjects, COUNT(DISTINCT o) AS objects "
+                    "FROM triples GROUP BY p) c JOIN terms t ON t.id = c.p")
+            }
+            class_counts = {}
+            type_id = self._lookup_id(RDF.type)
+            if type_id is not None:
+                class_counts = {
+                    _row_term(*row[:4]): row[4]
+                    for row in conn.execute(
+                        "SELECT t.kind, t.value, t.datatype, t.lang, c.n FROM "
+                        "(SELECT o, COUNT(*) AS n FROM triples WHERE p = ? GROUP BY o) c JOIN terms t ON t.id = c.o",
+                        (type_id,))
+                }
+            return {
+                "total": self._count,
+                "distinct_subjects": conn.execute("SELECT COUNT(DISTINCT s) FROM triples").fetchone()[0],
+                "distinct_objects": conn.execute("SELECT COUNT(DISTINCT o) FROM triples").fetchone()[0],
+                "predicates": predicates,
+                "class_counts": class_counts,
+            }
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # --- Namespaces ---
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        with self._lock:
+            bound_namespace = self._prefix_to_ns.get(prefix)
+            bound_prefix = self._ns_to_prefix.get(namespace)
+            if bound_prefix is None and bound_namespace is not None:
+                bound_prefix = self._ns_to_prefix.get(bound_namespace)
+            if override:
+                if bound_prefix is not None:
+                    self._prefix_to_ns.pop(bound_prefix, None)
+                if bound_namespace is not None:
+                    self._ns_to_prefix.pop(bound_namespace, None)
+                self._ns_to_prefix[namespace] = prefix
+                self._prefix_to_ns[prefix] = namespace
+            else:
+                self._ns_to_prefix[bound_namespace if bound_namespace is not None else namespace] = bound_prefix if bound_prefix is not None else prefix
+                self._prefix_to_ns[bound_prefix if bound_prefix is not None else prefix] = bound_namespace if bound_namespace is not None else namespace
+            if not self.read_only:
+                self._conn.execute("DELETE FROM namespaces")
+                self._conn.executemany("INSERT INTO namespaces (prefix, uri) VALUES (?, ?)",
+                                       [(p, str(ns)) for p, ns in self._prefix_to_ns.items()])
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self._prefix_to_ns.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self._ns_to_prefix.get(namespace)
+
+    def namespaces(self):
+        yield from list(self._prefix_to_ns.items())
+
+
+def open_sqlite_graph(path: str, read_only: bool = False) -> Graph:
+    """Opens (creating if needed) an rdflib Graph backed by the SQLite file at path."""
+    store = SQLiteStore(read_only=read_only)
+    if store.open(path, create=not read_only) != VALID_STORE:
+        raise FileNotFoundError(f"No SQLite triple store at {path}")
+    return Graph(store=store)
@@ -0,0 +1,139 @@
+import sys
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF
+
+from label_index import LABEL_PREDICATES, LabelIndex, uri_fragment
+from tokenization import text_tokens, words
+
+# Deterministic matching of free-text terms (e.g. entities extracted from documents)
+# against every label and URI fragment of an ontology, in decreasing strictness:
+#   exact       the term is a label as written
+#   normalized  same words after case folding, camelCase/snake_case splitting and light
+#               stemming ('Purchase orders' ~ ex:PurchaseOrder)
+#   acronym     the term is the initials of a multi-word label ('PO'), or the reverse
+# Anything else is left to the caller (fuzzy candidates, then an LLM if still unclear).
+# Words are split and stemmed by the shared rules in tokenization.
+
+
+def match_key(text: str) -> str:
+    return " ".join(text_tokens(text))
+
+
+def acronym(text: str) -> Optional[str]:
+    """Initials of a multi-word text ('Purchase Order' -> 'po'), else None."""
+    parts = words(text)
+    return "".join(word[0] for word in parts) if len(parts) > 1 else None
+
+
+class TermMatcher:
+    """
+    Exact, normalized and acronym lookup tables over the labels and URI fragments of
+    named entities, updated per added or removed triple. Each table counts, per URI, the
+    label assertions that put it under a key, so removing one of two labels that share
+    a key keeps the URI there. A URI's fragment stays once the URI has been seen.
+    Copies share the per-key URI tables until either side changes them.
+    """
+    PREDICATES = LabelIndex.PREDICATES
+
+    def __init__(self):
+        self._entities: Dict[str, None] = {} # URIs whose fragment is indexed
+        self._exact: Dict[str, Dict[str, int]] = {} # label -> {uri: assertions}
+        self._normalized: Dict[str, Dict[str, int]] = {} # match_key(label) -> {uri: assertions}
+        self._acronyms: Dict[str, Dict[str, int]] = {} # acronym(label) -> {uri: assertions}
+        self._owned: Optional[Set[Tuple[str, str]]] = None # (table, key) not shared with a copy; None: all
+
+    @classmethod
+    def build(cls, graph: Graph) -> "TermMatcher":
+        matcher = cls()
+        for pred in LABEL_PREDICATES:
+            for s, o in graph.subject_objects(pred):
+                matcher.add(s, pred, o)
+        for s in graph.subjects(RDF.type, None, unique=True):
+            matcher.add(s, RDF.type, None)
+        return matcher
+
+    def copy(self) -> "TermMatcher":
+        clone = TermMatcher()
+        clone._entities = self._entities.copy()
+        for name in ("_exact", "_normalized", "_acronyms"):
+            setattr(clone, name, getattr(self, name).copy())
+        self._owned, clone._owned = set(), set()
+        return clone
+
+    def _keys(self, label: str) -> Iterator[Tuple[str, str]]:
+        """(table attribute, key) pairs a label is filed under."""
+        yield "_exact", label
+        key = match_key(label)
+        if key:
+            yield "_normalized", key
+        initials = acronym(label)
+        if initials and len(initials) > 1:
+            yield "_acronyms", initials
+
+    def _writable_uris(self, name: str, key: str) -> Dict[str, int]:
+        table = getattr(self, name)
+        uris = table.get(key)
+        if uris is None:
+            uris = table[key] = {}
+        elif self._owned is not None and (name, key) not in self._owned:
+            uris = table[key] = uris.copy()
+        if self._owned is not None:
+            self._owned.add((name, key))
+        return uris
+
+    def _add_label(self, uri: str, label: str):
+        if not label:
+            return
+        for name, key in self._keys(label):
+            uris = self._writable_uris(name, key)
+            uris[uri] = uris.get(uri, 0) + 1
+
+    def add(self, s, p, o):
+        """Indexes a label assertion on a named entity, and the URI fragment of an entity seen for the first time."""
+        if not isinstance(s, URIRef):
+            return
+        uri = str(s)
+        if uri not in self._entities:
+            uri = sys.intern(uri)
+            self._entities[uri] = None
+            self._add_label(uri, uri_fragment(uri))
+        if p in LABEL_PREDICATES and isinstance(o, Literal):
+            self._add_label(uri, str(o))
+
+    def remove(self, s, p, o):
+        """Drops a label assertion (the URI fragment is kept)."""
+        if not isinstance(s, URIRef) or p not in LABEL_PREDICATES or not isinstance(o, Literal) or not str(o):
+            return
+        uri = str(s)
+        for name, key in self._keys(str(o)):
+            if uri not in getattr(self, name).get(key, ()):
+                continue
+            uris = self._writable_uris(name, key)
+            if uris[uri] > 1:
+                uris[uri] -= 1
+            else:
+                del uris[uri]
+                if not uris:
+                    del getattr(self, name)[key]
+
+    def match(self, term: str) -> Tuple[str, List[str]]:
+        """Returns (status, uris), status one of 'exact', 'normalized', 'acronym' or 'unknown'."""
+        uris = self._exact.get(term)
+        if uris:
+            return "exact", list(uris)
+        key = match_key(term)
+        uris = self._normalized.get(key)
+        if uris:
+            return "normalized", list(uris)
+        compact = term.strip()
+        if compact.isalnum() and 2 <= len(compact) <= 8 and sum(c.isupper() for c in compact) >= 2:
+            plural = compact.endswith("s") and compact[:-1].isupper() # 'POs'
+            uris = self._acronyms.get(compact.lower()) or (plural and self._acronyms.get(compact[:-1].lower()))
+            if uris:
+                return "acronym", list(uris)
+        initials = acronym(term)
+        if initials and initials in self._normalized:
+            return "acronym", list(self._normalized[initials]) # Spelled-out form of an acronym label
+        return "unknown", []
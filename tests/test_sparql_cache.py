@@ -0,0 +1,29 @@
+from sparql_cache import normalize_query
+
+
+def test_whitespace_and_comments_are_normalized():
+    a = "SELECT ?s # subjects\nWHERE {  ?s ?p ?o }"
+    b = "SELECT ?s WHERE { ?s ?p ?o }"
+    assert normalize_query(a) == normalize_query(b)
+
+
+def test_short_literals_are_preserved():
+    a = 'SELECT ?s WHERE { ?s ?p "a  b" }'
+    b = 'SELECT ?s WHERE { ?s ?p "a b" }'
+    assert normalize_query(a) != normalize_query(b)
+
+
+def test_queries_differing_inside_long_literals_get_different_keys():
+    for quote in ('"""', "'''"):
+        a = f"SELECT ?s WHERE {{ ?s ?p {quote}x #n{quote} }}"
+        b = f"SELECT ?s WHERE {{ ?s ?p {quote}x {quote} }}"
+        c = f"SELECT ?s WHERE {{ ?s ?p {quote}line one\n  line two{quote} }}"
+        d = f"SELECT ?s WHERE {{ ?s ?p {quote}line one line two{quote} }}"
+        assert normalize_query(a) != normalize_query(b)
+        assert normalize_query(c) != normalize_query(d)
+        assert f"{quote}x #n{quote}" in normalize_query(a)
+
+
+def test_long_literal_with_embedded_quotes():
+    query = 'SELECT ?s WHERE { ?s ?p """say "hi"  # not a comment""" }  # comment'
+    assert normalize_query(query) == 'SELECT ?s WHERE { ?s ?p """say "hi"  # not a comment""" }'
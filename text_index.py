@@ -0,0 +1,246 @@
+import math
+import sys
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import DC, DCTERMS, RDF, RDFS, SKOS
+
+from label_index import LABEL_PREDICATES, LabelIndex, uri_fragment
+from tokenization import char_ngrams, text_tokens
+
+# Lexical search indexes over the annotation literals of an ontology: a BM25 word index
+# over labels, comments and definitions, and a character trigram index over labels and
+# URI fragments for fuzzy matching. Both use the shared tokenization rules.
+
+# Literals covered by the full-text index, with the weight of a match in each
+TEXT_PREDICATE_WEIGHTS = {
+    RDFS.label: 3.0, SKOS.prefLabel: 3.0, SKOS.altLabel: 2.0, SKOS.hiddenLabel: 2.0,
+    DCTERMS.title: 2.0, DC.title: 2.0,
+    RDFS.comment: 1.0, SKOS.definition: 1.0, SKOS.note: 1.0, SKOS.scopeNote: 1.0, SKOS.example: 1.0,
+    DCTERMS.description: 1.0, DC.description: 1.0,
+}
+
+
+class TextIndex:
+    """
+    Inverted index from word tokens to the named entities whose labels, comments,
+    definitions or other annotation literals contain them, ranked with BM25
+    (label matches weigh more than description matches). Updated per added triple.
+    Postings are parallel arrays of URI ids and weighted term frequencies, scored with
+    NumPy; a URI may appear more than once in a token's postings (one entry per
+    literal), and its entries are summed when scoring. Copies share posting arrays
+    until either side adds to them.
+    """
+    PREDICATES = tuple(TEXT_PREDICATE_WEIGHTS)
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self):
+        self._uris: List[str] = []
+        self._uri_ids: Dict[str, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {} # token -> (uri ids, weighted term frequencies)
+        self._lengths = array("d") # uri id -> weighted token count
+        self._total_length = 0.0
+        self._owned: Optional[Set[str]] = None # Tokens whose postings are not shared with a copy; None: all
+
+    @classmethod
+    def build(cls, graph: Graph) -> "TextIndex":
+        index = cls()
+        for pred in cls.PREDICATES:
+            for s, o in graph.subject_objects(pred):
+                index.add(s, pred, o)
+        return index
+
+    def copy(self) -> "TextIndex":
+        clone = TextIndex()
+        clone._uris = self._uris.copy()
+        clone._uri_ids = self._uri_ids.copy()
+        clone._postings = self._postings.copy()
+        clone._lengths = array("d", self._lengths)
+        clone._total_length = self._total_length
+        self._owned, clone._owned = set(), set()
+        return clone
+
+    def _writable_postings(self, token: str) -> Tuple[array, array]:
+        postings = self._postings.get(token)
+        if postings is None:
+            postings = self._postings[token] = (array("I"), array("d"))
+        elif self._owned is not None and token not in self._owned:
+            postings = self._postings[token] = (array("I", postings[0]), array("d", postings[1]))
+        if self._owned is not None:
+            self._owned.add(token)
+        return postings
+
+    def add(self, s, p, o):
+        """Indexes a single triple if it is an annotation literal on a named entity."""
+        weight = TEXT_PREDICATE_WEIGHTS.get(p)
+        if weight is None or not isinstance(s, URIRef) or not isinstance(o, Literal):
+            return
+        tokens = text_tokens(str(o))
+        if not tokens:
+            return
+        uri = str(s)
+        uri_id = self._uri_ids.get(uri)
+        if uri_id is None:
+            uri = sys.intern(uri)
+            uri_id = self._uri_ids[uri] = len(self._uris)
+            self._uris.append(uri)
+            self._lengths.append(0.0)
+        for token, count in Counter(tokens).items():
+            ids, tfs = self._writable_postings(token)
+            if ids and ids[-1] == uri_id: # Another literal of the same entity
+                tfs[-1] += weight * count
+            else:
+                ids.append(uri_id)
+                tfs.append(weight * count)
+        self._lengths[uri_id] += weight * len(tokens)
+        self._total_length += weight * len(tokens)
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Returns (uri, score) pairs for entities matching any query token, best first."""
+        tokens = [token for token in dict.fromkeys(text_tokens(text)) if token in self._postings]
+        if not tokens or not self._uris:
+            return []
+        n = len(self._uris)
+        k1, b = self.BM25_K1, self.BM25_B
+        lengths = np.frombuffer(self._lengths, dtype=np.float64)
+        matched, contributions = [], []
+        for token in tokens:
+            ids, tfs = self._postings[token]
+            docs, entries = np.unique(np.frombuffer(ids, dtype=np.uint32), return_inverse=True)
+            tf = np.bincount(entries, weights=np.frombuffer(tfs, dtype=np.float64))
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * lengths[docs] * (n / self._total_length))
+            matched.append(docs)
+            contributions.append(idf * tf * (k1 + 1) / (tf + norm))
+        docs, entries = np.unique(np.concatenate(matched), return_inverse=True)
+        scores = np.bincount(entries, weights=np.concatenate(contributions))
+        top = min(limit, len(docs))
+        if top <= 0:
+            return []
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._uris[docs[i]], float(scores[i])) for i in best]
+
+    def __len__(self) -> int:
+        return len(self._uris)
+
+
+class NgramIndex:
+    """
+    Character trigram TF-IDF index over every label and URI fragment, for fuzzy
+    matching of free text against concept names ('purchse order' finds ex:PurchaseOrder).
+    Each (URI, label) pair is a document; postings are arrays of document ids, scored
+    with NumPy as the idf-weighted cosine of the query and document gram sets. Document
+    norms depend on the idf of all grams, so they are recomputed lazily after additions.
+    Copies share posting arrays until either side adds to them.
+    """
+    PREDICATES = LabelIndex.PREDICATES
+
+    def __init__(self):
+        self._uris: List[str] = []
+        self._uri_ids: Dict[str, int] = {}
+        self._docs: Dict[Tuple[int, str], None] = {} # (uri id, text) pairs already indexed
+        self._doc_uris = array("I") # doc id -> uri id
+        self._doc_texts: List[str] = []
+        self._postings: Dict[str, array] = {} # gram -> doc ids
+        self._norms: Optional[np.ndarray] = None # doc id -> idf-weighted norm; None when stale
+        self._owned: Optional[Set[str]] = None # Grams whose postings are not shared with a copy; None: all
+
+    @classmethod
+    def build(cls, graph: Graph) -> "NgramIndex":
+        index = cls()
+        for pred in LABEL_PREDICATES:
+            for s, o in graph.subject_objects(pred):
+                index.add(s, pred, o)
+        for s in graph.subjects(RDF.type, None, unique=True):
+            index.add(s, RDF.type, None)
+        index._doc_norms() # So the first search doesn't pay for it
+        return index
+
+    def copy(self) -> "NgramIndex":
+        clone = NgramIndex()
+        clone._uris = self._uris.copy()
+        clone._uri_ids = self._uri_ids.copy()
+        clone._docs = self._docs.copy()
+        clone._doc_uris = array("I", self._doc_uris)
+        clone._doc_texts = self._doc_texts.copy()
+        clone._postings = self._postings.copy()
+        clone._norms = self._norms
+        self._owned, clone._owned = set(), set()
+        return clone
+
+    def _writable_postings(self, gram: str) -> array:
+        docs = self._postings.get(gram)
+        if docs is None:
+            docs = self._postings[gram] = array("I")
+        elif self._owned is not None and gram not in self._owned:
+            docs = self._postings[gram] = array("I", docs)
+        if self._owned is not None:
+            self._owned.add(gram)
+        return docs
+
+    def _add_doc(self, uri: str, text: str):
+        uri_id = self._uri_ids.get(uri)
+        if uri_id is None:
+            uri = sys.intern(uri)
+            uri_id = self._uri_ids[uri] = len(self._uris)
+            self._uris.append(uri)
+            self._add_doc(uri, uri_fragment(uri))
+        if not text.strip() or (uri_id, text) in self._docs:
+            return
+        self._docs[(uri_id, text)] = None
+        doc_id = len(self._doc_texts)
+        self._doc_uris.append(uri_id)
+        self._doc_texts.append(text)
+        for gram in char_ngrams(text):
+            self._writable_postings(gram).append(doc_id)
+        self._norms = None
+
+    def add(self, s, p, o):
+        """Indexes a label assertion, or the URI fragment of a typed entity."""
+        if not isinstance(s, URIRef):
+            return
+        if p == RDF.type:
+            if str(s) not in self._uri_ids:
+                self._add_doc(str(s), "")
+        elif p in LABEL_PREDICATES and isinstance(o, Literal):
+            self._add_doc(str(s), str(o))
+
+    def _idf(self, df: int) -> float:
+        return math.log((1 + len(self._doc_texts)) / (1 + df)) + 1
+
+    def _doc_norms(self) -> np.ndarray:
+        if self._norms is None:
+            norms = np.zeros(len(self._doc_texts))
+            for docs in self._postings.values():
+                norms[np.frombuffer(docs, dtype=np.uint32)] += self._idf(len(docs)) ** 2
+            self._norms = np.sqrt(norms)
+        return self._norms
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[str, float, str]]:
+        """Returns (uri, score, matched label) for the closest URIs (best label per URI), best first."""
+        grams = [gram for gram in char_ngrams(text) if gram in self._postings]
+        if not grams:
+            return []
+        weights = [self._idf(len(self._postings[gram])) ** 2 for gram in grams]
+        docs = np.concatenate([np.frombuffer(self._postings[gram], dtype=np.uint32) for gram in grams])
+        doc_weights = np.repeat(weights, [len(self._postings[gram]) for gram in grams])
+        scores = np.bincount(docs, weights=doc_weights, minlength=len(self._doc_texts))
+        query_norm = math.sqrt(sum(self._idf(len(self._postings.get(g, ()))) ** 2 for g in char_ngrams(text)))
+        scores /= np.maximum(self._doc_norms(), 1e-12) * query_norm
+        # Several labels of one URI may match; over-fetch documents, then keep the best per URI
+        top = min(len(scores), limit * 4)
+        best_docs = np.argpartition(-scores, top - 1)[:top]
+        results: Dict[int, Tuple[float, str]] = {}
+        for doc_id in best_docs[np.argsort(-scores[best_docs], kind="stable")]:
+            uri_id = self._doc_uris[doc_id]
+            if scores[doc_id] > 0 and uri_id not in results:
+                results[uri_id] = (float(scores[doc_id]), self._doc_texts[doc_id])
+        return [(self._uris[uri_id], score, label) for uri_id, (score, label) in list(results.items())[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._uris)
@@ -0,0 +1,52 @@
+import re
+from typing import List
+
+# Text normalization shared by every lexical index (labels, full-text, trigrams, term
+# matching, hashing embeddings), so a label is split and stemmed the same way whichever
+# index it goes through: camelCase, snake_case and kebab-case identifiers become separate
+# lower-cased words ('PurchaseOrder_v2' -> 'purchase order v2'), and words are reduced
+# with the same conservative suffix rules ('invoices' -> 'invoice').
+
+_CAMEL_CASE_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_WORD_RE = re.compile(r"[^\W_]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+# (suffix, replacement, minimum word length); the first matching rule applies
+_SUFFIX_RULES = (
+    ("ies", "y", 5), ("sses", "ss", 5), ("xes", "x", 4), ("ches", "ch", 5), ("shes", "sh", 5),
+    ("ss", "ss", 0), ("us", "us", 0), ("is", "is", 0), ("s", "", 4),
+    ("ing", "", 6), ("ed", "", 5),
+)
+
+
+def words(text: str) -> List[str]:
+    """Lower-cased words, with camelCase split and '_', '-', '.' and punctuation as separators."""
+    return _WORD_RE.findall(_CAMEL_CASE_RE.sub(" ", text).lower())
+
+
+def light_stem(word: str) -> str:
+    """Conservative suffix stripping: plurals plus -ing/-ed on longer words ('invoices' -> 'invoice')."""
+    for suffix, replacement, min_length in _SUFFIX_RULES:
+        if word.endswith(suffix) and len(word) >= min_length:
+            return word[:len(word) - len(suffix)] + replacement
+    return word
+
+
+def text_tokens(text: str) -> List[str]:
+    """Stemmed words of a text, so 'Invoices' matches 'invoice' and 'PurchaseOrder' matches 'purchase order'."""
+    return [light_stem(word) for word in words(text)]
+
+
+def normalize_label(text: str) -> str:
+    """Case-folds and collapses whitespace so 'Purchase  order' and 'purchase order' compare equal."""
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def ngram_text(text: str) -> str:
+    """The words of a text joined by single spaces, so 'PurchaseOrder' reads 'purchase order'."""
+    return " ".join(words(text))
+
+
+def char_ngrams(text: str, n: int = 3) -> List[str]:
+    """Distinct character n-grams of ngram_text(text), padded so word starts and ends form their own grams."""
+    padded = f" {ngram_text(text)} "
+    return list(dict.fromkeys(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))))
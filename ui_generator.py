@@ -5,6 +5,9 @@ from typing import Dict, List, Any, Callable
 # This module takes instructions (usually from the agent/LLM)
 # and generates corresponding Streamlit UI elements.
 
+def _set_page(state: Dict[str, Any], page_key: str, page: int):
+    state[page_key] = max(page, 0)
+
 def render_ui_element(spec: Dict[str, Any], state: Dict[str, Any], callback_handler: Callable):
     """
     Renders a Streamlit UI element based on a specification dictionary.
@@ -30,6 +33,24 @@ def render_ui_element(spec: Dict[str, Any], state: Dict[str, Any], callback_hand
         else:
             st.warning(f"Invalid data format for dataframe: {type(data)}")
 
+    elif ui_type == "paged_dataframe":
+        # Rows are fetched one page at a time through spec['fetch_page'](page_index) -> DataFrame
+        fetch_page = spec.get("fetch_page")
+        page_size = spec.get("page_size", 100)
+        page_key = f"page_{element_id}"
+        page = state.get(page_key, 0)
+        if not callable(fetch_page):
+            st.warning("Invalid paged dataframe: missing page fetcher.")
+        else:
+            df = fetch_page(page)
+            st.dataframe(df)
+            prev_col, info_col, next_col = st.columns([1, 2, 1])
+            prev_col.button("Previous", key=f"prev_{page_key}", disabled=page == 0,
+                            on_click=_set_page, args=(state, page_key, page - 1))
+            info_col.caption(f"Page {page + 1} (rows {page * page_size + 1}-{page * page_size + len(df)})")
+            next_col.button("Next", key=f"next_{page_key}", disabled=len(df) < page_size,
+                            on_click=_set_page, args=(state, page_key, page + 1))
+
     elif ui_type == "table": # Simpler table
         data = spec.get("data", [])
         if isinstance(data, list) and data and isinstance(data[0], dict):